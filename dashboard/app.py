@@ -1,7 +1,7 @@
 import streamlit as st
-from data.loader import load_data
-from data.processor import process_data
-from components.sidebar import show_sidebar
+from data.processor import load_datasets
+from components.sidebar import show_sidebar, show_metrics_panel
+from utils.metrics import timed, runtime_gauges, export_metrics
 from views import overview, profitability, customers, imports, inventory, credit_risk
 
 # Page Config
@@ -11,25 +11,36 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load Data
-# We use st.cache_data in loader, so this is efficient
-with st.spinner("Cargando y procesando datos..."):
-    raw_data = load_data()
-    data = process_data(raw_data)
+# Pages by sidebar option
+PAGES = {
+    "Resumen General": overview,
+    "Rentabilidad": profitability,
+    "Clientes": customers,
+    "Importaciones": imports,
+    "Inventario": inventory,
+    "Riesgo Crediticio": credit_risk,
+}
 
 # Sidebar
-selection = show_sidebar()
+selection, period = show_sidebar()
+page = PAGES[selection]
+
+# Load Data
+# Only the tables and derived datasets the selected page declares
+# (REQUIRES) are loaded and processed; each one is cached on its own, so
+# reruns and page switches only pay for what is new. Changed source data
+# is reloaded in the background (data.refresh), so this only blocks the
+# first time a table is needed
+with st.spinner("Cargando y procesando datos..."):
+    data = load_datasets(page.REQUIRES)
 
 # Routing
-if selection == "Resumen General":
-    overview.show(data)
-elif selection == "Rentabilidad":
-    profitability.show(data)
-elif selection == "Clientes":
-    customers.show(data)
-elif selection == "Importaciones":
-    imports.show(data)
-elif selection == "Inventario":
-    inventory.show(data)
-elif selection == "Riesgo Crediticio":
-    credit_risk.show(data)
+# Every page applies the global period of the sidebar to its own date
+# column (resolved against its latest data, see data.periods)
+with timed("page", selection):
+    page.show(data, period)
+
+# Instrumentation: optional sidebar panel and Prometheus textfile export
+gauges = runtime_gauges(data)
+show_metrics_panel(data, gauges)
+export_metrics(gauges)
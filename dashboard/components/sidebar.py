@@ -1,8 +1,22 @@
+import pandas as pd
 import streamlit as st
+from data.periods import PERIOD_PRESETS, CUSTOM_PERIOD, DEFAULT_PERIOD
+from utils.metrics import METRICS_ENABLED, get_metrics, metrics_json, metrics_prometheus
+
+NAVIGATION_OPTIONS = [
+    "Resumen General",
+    "Rentabilidad",
+    "Clientes",
+    "Importaciones",
+    "Inventario",
+    "Riesgo Crediticio"
+]
 
 def show_sidebar():
     """
-    Renders the sidebar and returns the selected navigation option.
+    Renders the sidebar and returns the selected navigation option and the
+    global period: a preset label of data.periods.PERIOD_PRESETS or a
+    (first date, last date) custom range (see data.periods.resolve_period).
     """
     with st.sidebar:
         st.title("Comercializadora Andina")
@@ -10,18 +24,62 @@ def show_sidebar():
         
         st.header("Navegación")
         
-        options = [
-            "Resumen General",
-            "Rentabilidad",
-            "Clientes",
-            "Importaciones",
-            "Inventario",
-            "Riesgo Crediticio"
-        ]
+        selection = st.radio("Ir a", NAVIGATION_OPTIONS)
         
-        selection = st.radio("Ir a", options)
+        st.header("Periodo")
+        options = list(PERIOD_PRESETS) + [CUSTOM_PERIOD]
+        period = st.selectbox("Periodo", options, index=options.index(DEFAULT_PERIOD), label_visibility="collapsed")
+        if period == CUSTOM_PERIOD:
+            today = pd.Timestamp.today().date()
+            period = st.date_input("Rango de fechas", value=(today.replace(month=1, day=1), today))
+            st.caption("Se usan meses completos.")
         
         st.markdown("---")
         st.caption("Tablero v1.0")
         
-        return selection
+        return selection, period
+
+def show_metrics_panel(data, gauges):
+    """
+    Optional performance panel at the bottom of the sidebar: time, rows,
+    memory delta and cache hits/misses per loader table, processing step
+    and view section, with JSON / Prometheus downloads.
+    """
+    if not METRICS_ENABLED:
+        return
+    with st.sidebar:
+        if not st.toggle("⏱️ Métricas de rendimiento"):
+            return
+        
+        sections = pd.DataFrame(get_metrics().snapshot())
+        if sections.empty:
+            st.caption("Sin mediciones todavía.")
+            return
+        
+        lookups = gauges["andina_figure_cache_hits"] + gauges["andina_figure_cache_misses"]
+        if lookups:
+            st.metric("Aciertos caché de gráficos", f"{gauges['andina_figure_cache_hits'] / lookups:.0%}")
+        
+        st.dataframe(
+            sections.sort_values("seconds_last", ascending=False)[
+                ["kind", "name", "seconds_last", "rows_last", "memory_mb_last", "hits", "misses"]
+            ],
+            column_config={
+                "kind": "Tipo",
+                "name": "Sección",
+                "seconds_last": st.column_config.NumberColumn("Última (s)", format="%.3f"),
+                "rows_last": st.column_config.NumberColumn("Filas", format="%d"),
+                "memory_mb_last": st.column_config.NumberColumn("Δ Memoria (MB)", format="%.1f"),
+                "hits": "Aciertos",
+                "misses": "Fallos",
+            },
+            hide_index=True
+        )
+        
+        memory_report = getattr(data, "memory_report", None)
+        if memory_report is not None and not memory_report.empty:
+            st.caption("Memoria por tabla (MB)")
+            st.dataframe(memory_report[["tabla", "filas", "mb_after", "reduction"]], hide_index=True)
+        
+        st.download_button("Exportar JSON", metrics_json({"gauges": gauges}), file_name="andina_metrics.json", mime="application/json")
+        st.download_button("Exportar Prometheus", metrics_prometheus(gauges), file_name="andina_metrics.prom", mime="text/plain")
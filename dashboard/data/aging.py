@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Upper (inclusive) edges of the aging buckets in days past due.
+# [0, 30, 60, 90] -> Al Día, 1-30, 31-60, 61-90, 90+ Días
+AGING_EDGES = [0, 30, 60, 90]
+
+
+def aging_labels(edges=AGING_EDGES):
+    """Bucket labels for the given edges, in order."""
+    labels = ["Al Día"]
+    for low, high in zip(edges[:-1], edges[1:]):
+        labels.append(f"{low + 1}-{high} Días")
+    labels.append(f"{edges[-1]}+ Días")
+    return labels
+
+
+def bucket_aging(dias_mora, edges=AGING_EDGES):
+    """
+    Vectorized bucketing of days past due (one searchsorted over the whole
+    column instead of a Python call per invoice).
+    Returns a categorical Series ordered like aging_labels(edges);
+    missing values get no bucket.
+    """
+    days = dias_mora.to_numpy(dtype=float, na_value=np.nan)
+    codes = np.searchsorted(np.asarray(edges, dtype=float), days, side="left")
+    codes[np.isnan(days)] = -1
+    buckets = pd.Categorical.from_codes(codes, categories=aging_labels(edges), ordered=True)
+    return pd.Series(buckets, index=dias_mora.index, name="aging_bucket")
+
+
+def dias_mora_as_of(cartera, as_of):
+    """Days past due of every invoice at the cutoff date, from fecha_vencimiento."""
+    vencimiento = pd.to_datetime(cartera["fecha_vencimiento"], errors='coerce')
+    return (pd.Timestamp(as_of) - vencimiento).dt.days
+
+
+class AgingSnapshot:
+    """
+    Receivables aging computed once: bucketed balances, the overdue subset,
+    the per-region and per-client overdue totals and the top delinquent
+    invoices.
+    With as_of, dias_mora is recomputed at that cutoff date; otherwise the
+    dias_mora column of the data is used.
+    """
+    def __init__(self, cartera, as_of=None, edges=AGING_EDGES):
+        self.as_of = as_of
+        self.edges = list(edges)
+        self.labels = aging_labels(edges)
+
+        dias = cartera["dias_mora"] if as_of is None else dias_mora_as_of(cartera, as_of)
+        buckets = bucket_aging(dias, edges)
+        # Unknown days past due are not overdue (nullable ints compare to NA)
+        is_overdue = (dias > 0).fillna(False).to_numpy(dtype=bool)
+        saldo = cartera["saldo_cop"]
+
+        self.overdue = cartera.loc[is_overdue].assign(
+            dias_mora=dias[is_overdue],
+            aging_bucket=buckets[is_overdue]
+        )
+
+        self.kpis = pd.DataFrame([{
+            "total_receivables": saldo.sum(),
+            "overdue_receivables": self.overdue["saldo_cop"].sum(),
+        }])
+        self.summary = saldo.groupby(buckets, observed=False).sum().rename_axis("aging_bucket").reset_index()
+        self.by_region = (
+            self.overdue.groupby("region", observed=True)["saldo_cop"].sum()
+            .reset_index().sort_values("saldo_cop", ascending=False)
+        )
+        # Long form (client, bucket, balance): only the buckets each client
+        # actually has, instead of a dense clients x buckets table
+        self.by_client = (
+            self.overdue.groupby(["cliente_id", "aging_bucket"], observed=True)["saldo_cop"].sum()
+            .reset_index()
+        )
+        self._delinquent = self.overdue.groupby(["cliente_id", "documento_id"], observed=True).agg({
+            "saldo_cop": "sum",
+            "dias_mora": "max"
+        }).reset_index().sort_values("saldo_cop", ascending=False)
+
+    # Frames written to the shared store (see data.shared_store.shared_object)
+    _FRAMES = ["overdue", "kpis", "summary", "by_region", "by_client", "_delinquent"]
+
+    def to_frames(self):
+        """The computed frames as shared-store parts."""
+        return {name: getattr(self, name) for name in self._FRAMES}, {"as_of": self.as_of, "edges": self.edges}
+
+    @classmethod
+    def from_frames(cls, frames, meta, *inputs):
+        snapshot = cls.__new__(cls)
+        snapshot.as_of = None if meta["as_of"] is None else pd.Timestamp(meta["as_of"])
+        snapshot.edges = meta["edges"]
+        snapshot.labels = aging_labels(snapshot.edges)
+        for name in cls._FRAMES:
+            setattr(snapshot, name, frames[name])
+        return snapshot
+
+    def top_delinquent(self, top=20):
+        """Invoices with the largest overdue balance."""
+        return self._delinquent.head(top)
+
+
+def build_aging(cartera, as_of=None, edges=AGING_EDGES):
+    """Builds the AgingSnapshot of a cartera frame."""
+    return AgingSnapshot(cartera, as_of=as_of, edges=edges)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _aging_as_of(version, as_of, edges, _cartera):
+    return build_aging(_cartera, as_of=as_of, edges=list(edges))
+
+
+def get_aging(data, as_of=None, edges=AGING_EDGES):
+    """
+    Aging of the processed data: the precomputed snapshot for the default
+    cutoff, or a snapshot at as_of, memoized per data version.
+    """
+    if as_of is None and list(edges) == AGING_EDGES and "cartera_aging" in data:
+        return data["cartera_aging"]
+    version = getattr(data, "version", None)
+    if version is None:
+        return build_aging(data["cartera"], as_of=as_of, edges=edges)
+    return _aging_as_of(version, as_of, tuple(edges), data["cartera"])
@@ -0,0 +1,127 @@
+import pandas as pd
+from data.periods import date_bounds
+
+# Additive measures kept in every rollup. 'transacciones' is the row count.
+MEASURES = ["subtotal_cop", "margen_total_cop", "cantidad", "transacciones"]
+
+# Rollups built from the sales star (ventas_star). Queries are answered from
+# the smallest rollup (fewest groups) that contains every requested
+# dimension.
+ROLLUPS = {
+    # Coarse rollups without product or client ids. The geographic one
+    # answers the KPIs and the monthly/region/segment/city totals; the
+    # category one the category/subcategory totals
+    "geografia": ["mes", "region", "ciudad", "segmento"],
+    "categoria": ["mes", "region", "ciudad", "segmento", "categoria", "subcategoria"],
+    "producto": ["mes", "region", "ciudad", "segmento", "categoria", "subcategoria", "producto_id", "descripcion"],
+    "cliente": ["mes", "region", "ciudad", "segmento", "cliente_id", "nombre_cliente"],
+}
+
+
+def build_rollup(df, dims):
+    """
+    Aggregates the additive measures of a sales frame over dims.
+    Null dimension values are kept as their own group so totals match the
+    row-level data.
+    """
+    dims = [d for d in dims if d in df.columns]
+    measures = {m: "sum" for m in MEASURES if m in df.columns}
+    grouped = df.groupby(dims, observed=True, dropna=False, sort=False)
+    rollup = grouped.agg(measures) if measures else pd.DataFrame(index=grouped.size().index)
+    rollup["transacciones"] = grouped.size()
+    return rollup.reset_index()
+
+
+class SalesCube:
+    """
+    Pre-aggregated sales rollups: month x geography x segment, the same
+    by category, by product and by client.
+    Views query it instead of grouping the row-level sales, so
+    render time depends on the number of groups, not on the number of sales.
+    Rollups are sorted by month: a period (desde/hasta) is a contiguous
+    slice found by binary search, the other months are never read.
+    """
+    def __init__(self, rollups):
+        # Rollups mapped back from the shared store are already sorted
+        self.rollups = {
+            name: rollup.sort_values("mes", kind="stable").reset_index(drop=True)
+            if "mes" in rollup.columns and not rollup["mes"].is_monotonic_increasing else rollup
+            for name, rollup in rollups.items()
+        }
+
+    def to_frames(self):
+        """The rollups as shared-store parts (see data.shared_store.shared_object)."""
+        return self.rollups, {}
+
+    @classmethod
+    def from_frames(cls, frames, meta, *inputs):
+        return cls(frames)
+
+    def _rollup_for(self, dims, desde=None, hasta=None):
+        candidates = [rollup for rollup in self.rollups.values() if all(d in rollup.columns for d in dims)]
+        if not candidates:
+            raise KeyError(f"Ningún rollup contiene las dimensiones {dims}")
+        rollup = min(candidates, key=len)
+        if (desde is None and hasta is None) or "mes" not in rollup.columns:
+            return rollup
+        lo, hi = date_bounds(rollup["mes"].to_numpy(), desde, hasta)
+        return rollup.iloc[lo:hi]
+
+    @staticmethod
+    def _apply_filters(df, filters):
+        for col, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                df = df[df[col].isin(value)]
+            else:
+                df = df[df[col] == value]
+        return df
+
+    def query(self, by, filters=None, measures=None, sort=None, ascending=False, top=None, desde=None, hasta=None):
+        """
+        Returns the measures aggregated by the 'by' dimensions.
+        filters: {dimension: value or list of values}
+        measures: subset of MEASURES (default all)
+        sort/ascending/top: optional ordering and head(top) of the result.
+        desde/hasta: optional period (months with desde <= mes < hasta).
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        filters = filters or {}
+        df = self._apply_filters(self._rollup_for(by + list(filters), desde, hasta), filters)
+        measures = [m for m in (measures or MEASURES) if m in df.columns]
+
+        result = df.groupby(by, observed=True, sort=False)[measures].sum().reset_index()
+        if sort is not None:
+            result = result.sort_values(sort, ascending=ascending)
+        if top is not None:
+            result = result.head(top)
+        return result
+
+    def total(self, measure, filters=None, desde=None, hasta=None):
+        """Grand total of one measure, optionally filtered and for a period."""
+        filters = filters or {}
+        df = self._apply_filters(self._rollup_for(list(filters), desde, hasta), filters)
+        return df[measure].sum()
+
+    def last_month(self):
+        """Latest month with sales (None if there is none)."""
+        for rollup in self.rollups.values():
+            if "mes" in rollup.columns:
+                months = rollup["mes"].dropna()
+                return months.iloc[-1] if len(months) else None
+        return None
+
+    def members(self, dim):
+        """Sorted distinct non-null values of a dimension."""
+        return sorted(self._rollup_for([dim])[dim].dropna().unique())
+
+
+def build_sales_cube(sales):
+    """
+    Builds the SalesCube from the sales star (once per data version).
+    Only the columns the rollups use are joined from the dimensions.
+    """
+    needed = {"fecha", *MEASURES, *(dim for dims in ROLLUPS.values() for dim in dims)}
+    df = sales.select([col for col in sales.columns if col in needed])
+    if "fecha" in df.columns:
+        df = df.assign(mes=df["fecha"].dt.to_period("M").dt.to_timestamp())
+    return SalesCube({name: build_rollup(df, dims) for name, dims in ROLLUPS.items()})
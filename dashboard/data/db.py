@@ -0,0 +1,150 @@
+import os
+import threading
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from sqlalchemy import text
+from data.schema import read_columns, table_columns
+
+# Configuration
+# SQLAlchemy pool of the Supabase connection (shared by all sessions)
+POOL_SIZE = int(os.environ.get("ANDINA_DB_POOL_SIZE", 4))
+POOL_MAX_OVERFLOW = int(os.environ.get("ANDINA_DB_MAX_OVERFLOW", 2))
+POOL_TIMEOUT = 30  # seconds to wait for a free connection
+POOL_RECYCLE = 1800  # seconds; Supabase's pooler drops idle connections
+# Queries running at once per process (table loads + pushed-down
+# aggregations); the rest wait instead of piling up on the database
+MAX_CONCURRENT_QUERIES = int(os.environ.get("ANDINA_DB_CONCURRENCY", POOL_SIZE))
+# Rows fetched per round trip from the server-side cursor
+FETCH_BATCH_ROWS = int(os.environ.get("ANDINA_DB_BATCH_ROWS", 50_000))
+
+_query_slots = threading.BoundedSemaphore(MAX_CONCURRENT_QUERIES)
+
+
+def get_connection():
+    """
+    The Supabase SQL connection, with the pool settings above
+    (st.connection keeps one per process).
+    """
+    return st.connection(
+        "supabase", type="sql",
+        pool_size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE, pool_pre_ping=True
+    )
+
+
+def query_slot():
+    """Context manager that waits for one of MAX_CONCURRENT_QUERIES slots."""
+    return _query_slots
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def projection(conn, key, table_name):
+    """
+    Columns of a table that the dashboard reads (data.schema.read_columns)
+    and that exist in the database, in declared order. Undeclared and
+    unread columns are never transferred.
+    """
+    with query_slot(), conn.engine.connect() as connection:
+        existing = set(connection.execute(text(f"SELECT * FROM {_quote(table_name)} LIMIT 0")).keys())
+    columns = tuple(col for col in read_columns(key) if col in existing)
+    if not columns:
+        raise ValueError(f"'{table_name}' no tiene ninguna de las columnas declaradas")
+    return columns
+
+
+@lru_cache(maxsize=None)
+def select_statement(table_name, columns, since=None):
+    """
+    Prepared SELECT of the given columns, optionally only the rows with
+    since >= :mark. Identifiers come from the schema registry and are
+    quoted; values are always bound parameters. Built once per
+    (table, projection) and reused.
+    """
+    sql = f"SELECT {', '.join(_quote(col) for col in columns)} FROM {_quote(table_name)}"
+    if since is not None:
+        sql += f" WHERE {_quote(since)} >= :mark"
+    return text(sql)
+
+
+@lru_cache(maxsize=None)
+def max_statement(table_name, column):
+    """Prepared SELECT MAX(column) of a table."""
+    return text(f"SELECT MAX({_quote(column)}) AS mark FROM {_quote(table_name)}")
+
+
+@lru_cache(maxsize=None)
+def version_statement(table_name, column=None):
+    """
+    Prepared SELECT COUNT(*) and MAX(column) of a table (NULL without a
+    column): a cheap server-side version of its content.
+    """
+    mark = f"MAX({_quote(column)})" if column is not None else "NULL"
+    return text(f"SELECT COUNT(*) AS n, {mark} AS mark FROM {_quote(table_name)}")
+
+
+def conform(df, key):
+    """
+    Casts a fetched frame to the declared types of the table, so every
+    batch has the same dtypes as the CSV path (e.g. numeric -> float
+    instead of Decimal objects, dates -> datetime64).
+    """
+    converted = {}
+    for col, kind in table_columns(key).items():
+        if col not in df.columns:
+            continue
+        if kind == "date":
+            converted[col] = pd.to_datetime(df[col], errors='coerce').astype("datetime64[us]")
+        elif kind == "float":
+            converted[col] = pd.to_numeric(df[col], errors='coerce').astype("float64")
+        elif kind == "int":
+            converted[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.assign(**converted) if converted else df
+
+
+def fetch_batches(conn, statement, key, params=None):
+    """
+    Runs a statement on a pooled connection with a server-side cursor and
+    yields the result as conformed DataFrames of up to FETCH_BATCH_ROWS
+    rows, so the full result set is never held in memory at once.
+    Holds a query slot until the generator is exhausted or closed.
+    """
+    with query_slot(), conn.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(statement, params or {})
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions(FETCH_BATCH_ROWS):
+            empty = False
+            yield conform(pd.DataFrame.from_records(rows, columns=columns), key)
+        if empty:
+            # Still one (empty) frame with the result's columns and types
+            yield conform(pd.DataFrame(columns=columns), key)
+
+
+def record_batches(frames, schema):
+    """Arrow record batches of the given schema from fetched frames."""
+    for df in frames:
+        yield pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def fetch_frame(conn, statement, key, params=None):
+    """The whole result of a (small) statement as one conformed DataFrame."""
+    return pd.concat(list(fetch_batches(conn, statement, key, params)), ignore_index=True)
+
+
+def fetch_row(conn, statement, params=None):
+    """First row of a statement as a tuple (None if no rows)."""
+    with query_slot(), conn.engine.connect() as connection:
+        row = connection.execute(statement, params or {}).first()
+    return tuple(row) if row is not None else None
+
+
+def fetch_value(conn, statement, params=None):
+    """First column of the first row of a statement (None if no rows)."""
+    with query_slot(), conn.engine.connect() as connection:
+        return connection.execute(statement, params or {}).scalar()
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import threading
+
+import pyarrow.dataset as ds
+import streamlit as st
+
+try:
+    import duckdb
+except ImportError:  # optional dependency, only needed for ANDINA_ENGINE=duckdb
+    duckdb = None
+
+from data.loader import DATA_PATH, TABLES, FILES
+from data.snapshot import SNAPSHOT_TTL, is_fresh, read_snapshot_meta, snapshot_file
+
+# Configuration
+ENGINE = os.environ.get("ANDINA_ENGINE", "pandas")  # "pandas" or "duckdb"
+ENGINE_MEMORY_LIMIT = os.environ.get("ANDINA_ENGINE_MEMORY", "2GB")
+ENGINE_THREADS = os.cpu_count() or 1
+
+# Sales enriched with the product and customer attributes the views use.
+# Defined as a view, so nothing is materialized; PostgreSQL-compatible so
+# the same text can be used as a CTE on Supabase.
+VENTAS_ENRICHED_SQL = """
+    SELECT v.*, p.descripcion, c.nombre_cliente
+    FROM ventas_andina v
+    LEFT JOIN productos_andina p ON p.producto_id = v.producto_id
+    LEFT JOIN clientes_andina c ON c.cliente_id = v.cliente_id
+"""
+
+_engine_lock = threading.Lock()
+
+
+def engine_enabled():
+    """True when the embedded DuckDB engine is selected and installed."""
+    return ENGINE == "duckdb" and duckdb is not None
+
+
+def _csv_relation(key):
+    path = os.path.join(DATA_PATH, FILES[key]).replace("'", "''")
+    if key == "importaciones":
+        return f"read_csv('{path}', delim=';', decimal_separator=',', header=true)"
+    return f"read_csv('{path}', header=true)"
+
+
+def _source(key):
+    """
+    The file the engine scans for a table and its format: the typed Arrow
+    snapshot (scanned in place, no copy), else a Parquet export, else the
+    CSV.
+    """
+    table_name = TABLES[key]
+    snapshot = snapshot_file(table_name)
+    parquet = os.path.join(DATA_PATH, f"{table_name}.parquet")
+    if os.path.exists(snapshot):
+        return snapshot, "ipc"
+    if os.path.exists(parquet):
+        return parquet, "parquet"
+    return os.path.join(DATA_PATH, FILES[key]), "csv"
+
+
+def _register_table(con, key, path, kind):
+    """Exposes one andina table to the engine as a view over its file."""
+    table_name = TABLES[key]
+    if kind == "ipc":
+        con.register(table_name, ds.dataset(path, format="ipc"))
+    elif kind == "parquet":
+        path = path.replace("'", "''")
+        con.execute(f"CREATE OR REPLACE VIEW {table_name} AS SELECT * FROM read_parquet('{path}')")
+    else:
+        con.execute(f"CREATE OR REPLACE VIEW {table_name} AS SELECT * FROM {_csv_relation(key)}")
+
+
+@st.cache_resource(ttl=SNAPSHOT_TTL, max_entries=2, show_spinner=False)
+def get_engine(sources):
+    """
+    In-memory DuckDB database with the six andina tables registered as
+    views over the given files (one (path, format) per TABLES key, see
+    _source) and ventas_enriched as a join view.
+    A new snapshot or export changes the sources and so the database;
+    it is also rebuilt every SNAPSHOT_TTL.
+    """
+    con = duckdb.connect()
+    con.execute(f"SET threads = {ENGINE_THREADS}")
+    con.execute(f"SET memory_limit = '{ENGINE_MEMORY_LIMIT}'")
+    for key, (path, kind) in zip(TABLES, sources):
+        _register_table(con, key, path, kind)
+    con.execute(f"CREATE OR REPLACE VIEW ventas_enriched AS {VENTAS_ENRICHED_SQL}")
+    return con
+
+
+def engine_version(tables):
+    """
+    Version of what the engine reads for the given tables (path, mtime and
+    size of each file), to key results on without loading them; None when
+    a table has to go through the loader first: its snapshot is missing or
+    stale (same rule as data.loader) and there is no Parquet export, so
+    the engine would otherwise parse the raw CSV on every query.
+    """
+    parts = []
+    for key in tables:
+        path, kind = _source(key)
+        if kind == "csv":
+            return None
+        if kind == "ipc":
+            meta = read_snapshot_meta(TABLES[key])
+            csv = os.path.join(DATA_PATH, FILES[key]) if meta and meta.get("source") == "csv" else None
+            if not is_fresh(meta, source_path=csv):
+                return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        parts.append((key, path, stat.st_mtime_ns, stat.st_size))
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def engine_query(sql, params=None):
+    """
+    Runs a query on the embedded engine and returns a DataFrame.
+    Accepts the same ':name' bound parameters as the Supabase queries.
+    Queries are serialized on the shared connection; each one already uses
+    all ENGINE_THREADS.
+    """
+    sql = re.sub(r"(?<![:\w]):(\w+)", r"$\1", sql)
+    con = get_engine(tuple(_source(key) for key in TABLES))
+    with _engine_lock:
+        return con.execute(sql, params or {}).df()
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from data.periods import date_bounds
+
+# Dimensions with a precomputed partition index on ventas_star
+FILTER_DIMENSIONS = ["segmento", "categoria", "region", "ciudad"]
+
+
+class PartitionIndex:
+    """
+    Row positions of a frame grouped by the values of some dimensions,
+    computed once per data version. A filter selection becomes a take of
+    the k matching rows instead of a full-column mask plus copy.
+    With a date column, the row positions are also kept in date order, so
+    a period (desde/hasta) is a contiguous run of them found by binary
+    search.
+    """
+    def __init__(self, df, dims, date_col=None):
+        # df is a DataFrame or a SalesStar (column access only)
+        self.positions = {
+            dim: df[dim].groupby(df[dim], observed=True, sort=False).indices
+            for dim in dims if dim in df.columns
+        }
+        self.date_col = date_col if date_col is not None and date_col in df.columns else None
+        if self.date_col is not None:
+            dates = df[date_col].to_numpy()
+            self._date_order = np.argsort(dates, kind="stable")
+            self._sorted_dates = dates[self._date_order]
+
+    def to_frames(self):
+        """
+        Shared-store parts (see data.shared_store.shared_object): per
+        dimension, the row positions of every value one after the other,
+        with the values and their bounds in meta; plus the date order.
+        """
+        frames, groups = {}, {}
+        for dim, positions in self.positions.items():
+            lengths = [len(rows) for rows in positions.values()]
+            rows = np.concatenate(list(positions.values())) if positions else np.empty(0, dtype=np.intp)
+            frames[f"dim.{dim}"] = pd.DataFrame({"row": rows})
+            groups[dim] = {"values": pd.Index(list(positions)).tolist(), "bounds": np.concatenate([[0], np.cumsum(lengths)]).tolist()}
+        if self.date_col is not None:
+            frames["dates"] = pd.DataFrame({"order": self._date_order, "date": self._sorted_dates})
+        return frames, {"groups": groups, "date_col": self.date_col}
+
+    @classmethod
+    def from_frames(cls, frames, meta, *inputs):
+        index = cls.__new__(cls)
+        index.positions = {}
+        for dim, groups in meta["groups"].items():
+            rows, bounds = frames[f"dim.{dim}"]["row"].to_numpy(), groups["bounds"]
+            index.positions[dim] = {
+                value: rows[lo:hi] for value, lo, hi in zip(groups["values"], bounds[:-1], bounds[1:])
+            }
+        index.date_col = meta["date_col"]
+        if index.date_col is not None:
+            index._date_order = frames["dates"]["order"].to_numpy()
+            index._sorted_dates = frames["dates"]["date"].to_numpy()
+        return index
+
+    def rows(self, desde=None, hasta=None, **filters):
+        """
+        Sorted row positions matching every filter (dimension=value) and
+        the period desde <= date < hasta.
+        None values are ignored; returns None when nothing is filtered.
+        """
+        selected = None
+        if desde is not None or hasta is not None:
+            if self.date_col is None:
+                raise KeyError("No hay índice de fechas")
+            lo, hi = date_bounds(self._sorted_dates, desde, hasta)
+            selected = np.sort(self._date_order[lo:hi])
+        for dim, value in filters.items():
+            if value is None:
+                continue
+            if dim not in self.positions:
+                raise KeyError(f"No hay índice para '{dim}'")
+            rows = self.positions[dim].get(value, np.empty(0, dtype=np.intp))
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        return selected
+
+    def take(self, df, **filters):
+        """Returns the rows of df matching the filters (df itself if none)."""
+        rows = self.rows(**filters)
+        return df if rows is None else df.take(rows)
+
+
+def build_partition_index(df, dims=FILTER_DIMENSIONS, date_col=None):
+    """Builds the PartitionIndex for the common filter dimensions."""
+    return PartitionIndex(df, dims, date_col)
+
+
+def filter_rows(data, key, columns=None, **filters):
+    """
+    Shared filtering API for the views: rows of data[key] matching the
+    filters, using the precomputed index '<key>_index' when there is one.
+    desde/hasta select a period; they need an index with a date column.
+    columns limits the result to those columns; on a SalesStar only those
+    dimension columns are joined, and only for the matching rows.
+    """
+    table = data[key]
+    index = data.get(f"{key}_index")
+    if index is not None:
+        rows = index.rows(**filters)
+    else:
+        if filters.get("desde") is not None or filters.get("hasta") is not None:
+            raise KeyError(f"No hay índice de fechas para '{key}'")
+        rows = None
+        for dim, value in filters.items():
+            if value is not None:
+                match = np.flatnonzero(table[dim] == value)
+                rows = match if rows is None else np.intersect1d(rows, match, assume_unique=True)
+    if not isinstance(table, pd.DataFrame):
+        return table.select(columns, rows)
+    df = table if columns is None else table[columns]
+    return df if rows is None else df.take(rows)
@@ -0,0 +1,57 @@
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from data.schema import ARROW_TYPES, CSV_DATE_FORMAT, TABLE_SCHEMAS, table_columns
+from data.snapshot import read_snapshot, snapshot_file, write_batches, write_snapshot
+
+# Bytes parsed per block: bounds the memory used while ingesting a CSV,
+# whatever its size (blocks are parsed on Arrow's thread pool)
+CSV_BLOCK_MB = int(os.environ.get("ANDINA_CSV_BLOCK_MB", 16))
+
+def csv_options(key):
+    """pyarrow.csv read/parse/convert options from the table's schema."""
+    schema = TABLE_SCHEMAS.get(key, {})
+    read = pa_csv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_MB << 20)
+    parse = pa_csv.ParseOptions(delimiter=schema.get("sep", ","))
+    convert = pa_csv.ConvertOptions(
+        column_types={col: ARROW_TYPES[kind] for col, kind in table_columns(key).items()},
+        timestamp_parsers=[CSV_DATE_FORMAT],
+        decimal_point=schema.get("decimal", "."),
+    )
+    return read, parse, convert
+
+
+def ingest_csv(key, file_path, table_name):
+    """
+    Reads the CSV export of a table straight into its Arrow snapshot and
+    returns it memory-mapped. The file is streamed block by block with
+    the declared types, so dates, decimal commas and numbers are parsed
+    in a single pass and no copy of the file is held in memory: peak
+    memory is a few blocks (CSV_BLOCK_MB) whatever the file size.
+    An export that does not match its schema (e.g. a malformed date) is
+    read with pandas instead, inferring types as before; process_data
+    coerces what it can.
+    """
+    # Taken before reading: a CSV rewritten meanwhile makes the snapshot stale
+    meta = {"source": "csv", "written_at": time.time()}
+    try:
+        read, parse, convert = csv_options(key)
+        # Memory-mapped: the blocks queued ahead of the parser are file
+        # pages the OS can evict, not copies (a regular file reader buffers
+        # the whole file ahead of it)
+        with pa.memory_map(file_path, "r") as source:
+            reader = pa_csv.open_csv(source, read_options=read, parse_options=parse, convert_options=convert)
+            write_batches(snapshot_file(table_name), reader.schema, reader, meta)
+        df = read_snapshot(table_name)
+        if df is not None:
+            return df
+    except (pa.ArrowInvalid, OSError):
+        pass
+
+    schema = TABLE_SCHEMAS.get(key, {})
+    df = pd.read_csv(file_path, sep=schema.get("sep", ","), decimal=schema.get("decimal", "."))
+    write_snapshot(table_name, df, source="csv")
+    return df
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+
+class InventoryStore:
+    """
+    Inventory history partitioned by fecha_corte.
+    Rows are sorted by cutoff once, so every cutoff is a contiguous slice:
+    reading a snapshot touches only its own partition. The latest snapshot
+    and the per-cutoff totals are materialized when the store is built.
+    """
+    def __init__(self, inventario, date_col="fecha_corte", presorted=False):
+        self.date_col = date_col
+        if presorted:
+            # Already sorted by a previous build (see from_frames)
+            self.frame = inventario
+        else:
+            dates = pd.to_datetime(inventario[date_col], errors='coerce')
+            order = np.argsort(dates.to_numpy(), kind="stable")
+            self.frame = inventario.take(order).assign(**{date_col: dates.take(order).to_numpy()}).reset_index(drop=True)
+
+        sorted_dates = self.frame[date_col].dropna().to_numpy()
+        self.dates, starts = np.unique(sorted_dates, return_index=True)
+        self._starts = starts
+        self._ends = np.append(starts[1:], len(sorted_dates))
+
+        self.latest_date = pd.Timestamp(self.dates[-1]) if len(self.dates) else None
+        self.latest = self.partition(self.latest_date) if self.latest_date is not None else self.frame.iloc[0:0]
+
+        measures = [c for c in ["valor_inventario_cop", "stock_unidades"] if c in self.frame.columns]
+        self.totals = self.frame.groupby(date_col, sort=True)[measures].sum().reset_index()
+
+    def to_frames(self):
+        """The sorted frame as a shared-store part (see data.shared_store.shared_object)."""
+        return {"frame": self.frame}, {"date_col": self.date_col}
+
+    @classmethod
+    def from_frames(cls, frames, meta, *inputs):
+        return cls(frames["frame"], meta["date_col"], presorted=True)
+
+    def _position(self, date):
+        # Index of the last cutoff <= date (-1 if date is before all cutoffs)
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date)), side="right")) - 1
+
+    def partition(self, date):
+        """Rows of exactly one cutoff date (empty frame if there is none)."""
+        i = self._position(date)
+        if i < 0 or self.dates[i] != np.datetime64(pd.Timestamp(date)):
+            return self.frame.iloc[0:0]
+        return self.frame.iloc[self._starts[i]:self._ends[i]]
+
+    def as_of(self, date):
+        """
+        Inventory as of a date: the partition of the last cutoff on or
+        before it. Returns (cutoff_date, rows); (None, empty) if none.
+        """
+        i = self._position(date)
+        if i < 0:
+            return None, self.frame.iloc[0:0]
+        return pd.Timestamp(self.dates[i]), self.frame.iloc[self._starts[i]:self._ends[i]]
+
+
+def build_inventory_store(inventario):
+    """Builds the InventoryStore (once per data version)."""
+    return InventoryStore(inventario)
@@ -1,76 +1,309 @@
 import pandas as pd
 import streamlit as st
 import os
+import hashlib
+import threading
+import time
+import weakref
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from data.snapshot import read_snapshot, read_snapshot_meta, is_fresh
+from data.ingest import ingest_csv
+from data.sync import sync_table
+from data.db import get_connection
+from data.refresh import REFRESH_INTERVAL, TableEntry, TableStore, start_refresher
+from utils.metrics import timed, note_miss
 
 # Configuration
-DATA_PATH = "c:/Users/Pedro Luis/Downloads/Clase 2811/Data/"
+DATA_PATH = os.environ.get("ANDINA_DATA_PATH", "c:/Users/Pedro Luis/Downloads/Clase 2811/Data/")
+MAX_WORKERS = int(os.environ.get("ANDINA_LOAD_WORKERS", 4))  # 1 = serial loading
+TABLE_TIMEOUT = 120  # seconds a single table may take before falling back to CSV
 
-@st.cache_data
-def load_data():
+# Map keys to table names
+TABLES = {
+    "ventas": "ventas_andina",
+    "clientes": "clientes_andina",
+    "productos": "productos_andina",
+    "cartera": "cartera_andina",
+    "inventario": "inventario_andina",
+    "importaciones": "importaciones_andina"
+}
+
+# Fallback file mapping
+FILES = {
+    "ventas": "ventas_andina.csv",
+    "clientes": "clientes_andina.csv",
+    "productos": "productos_andina.csv",
+    "cartera": "cartera_andina.csv",
+    "inventario": "inventario_andina.csv",
+    "importaciones": "importaciones_andina.csv"
+}
+
+def _read_csv(key):
     """
-    Loads all necessary data from Supabase.
-    Falls back to CSV files if connection fails.
-    Returns a dictionary of DataFrames.
-    """
-    # Map keys to table names
-    tables = {
-        "ventas": "ventas_andina",
-        "clientes": "clientes_andina",
-        "productos": "productos_andina",
-        "cartera": "cartera_andina",
-        "inventario": "inventario_andina",
-        "importaciones": "importaciones_andina"
-    }
-    
-    # Fallback file mapping
-    files = {
-        "ventas": "ventas_andina.csv",
-        "clientes": "clientes_andina.csv",
-        "productos": "productos_andina.csv",
-        "cartera": "cartera_andina.csv",
-        "inventario": "inventario_andina.csv",
-        "importaciones": "importaciones_andina.csv"
-    }
-    
-    data = {}
-    
+    Reads the local CSV export of a table into its snapshot, parsed with
+    the table's declared schema (see data.schema, data.ingest).
+    """
+    return ingest_csv(key, os.path.join(DATA_PATH, FILES[key]), TABLES[key])
+
+def _load_csv_or_snapshot(key, notices):
+    """
+    CSV fallback for a table. If the CSV cannot be read either, the last
+    snapshot (even if stale) is preferred over an empty DataFrame.
+    Messages for the user are appended to notices as (level, text).
+    """
+    try:
+        return _read_csv(key)
+    except Exception as e:
+        df = read_snapshot(TABLES[key])
+        if df is not None:
+            notices.append(("warning", f"⚠️ Usando la última copia local disponible de '{TABLES[key]}'."))
+            return df
+        notices.append(("error", f"Error cargando CSV para {key}: {e}"))
+        return pd.DataFrame()
+
+def _load_table(conn, key, notices):
+    """
+    Loads one table from Supabase (incremental where possible), falling
+    back to its CSV. With conn=None the CSV is used directly.
+    Runs inside a worker thread, so it never calls st.* itself.
+    """
+    if conn is None:
+        return _load_csv_or_snapshot(key, notices)
+    try:
+        return sync_table(conn, key, TABLES[key])
+    except Exception as e:
+        # Fallback to CSV for this specific table
+        notices.append(("warning", f"⚠️ No se pudo cargar '{TABLES[key]}' desde Supabase. Usando CSV local."))
+        return _load_csv_or_snapshot(key, notices)
+
+def _load_fresh_snapshot(key):
+    """
+    Returns the snapshot of a table if it is fresh, else None.
+    Supabase snapshots expire after SNAPSHOT_TTL; CSV snapshots stay valid
+    until the CSV file changes.
+    """
+    table_name = TABLES[key]
+    meta = read_snapshot_meta(table_name)
+    if meta is None:
+        return None
+    source_path = os.path.join(DATA_PATH, FILES[key]) if meta.get("source") == "csv" else None
+    if not is_fresh(meta, source_path=source_path):
+        return None
+    return read_snapshot(table_name)
+
+def _connect(notices):
     try:
         # Try to connect to Supabase
-        conn = st.connection("supabase", type="sql")
-        
-        for key, table_name in tables.items():
-            try:
-                # Try loading from Supabase
-                df = conn.query(f"SELECT * FROM {table_name}", ttl=600)
-                data[key] = df
-            except Exception as e:
-                # Fallback to CSV for this specific table
-                st.warning(f"⚠️ No se pudo cargar '{table_name}' desde Supabase. Usando CSV local.")
-                file_path = os.path.join(DATA_PATH, files[key])
-                try:
-                    if key == "importaciones":
-                        df = pd.read_csv(file_path, sep=';', decimal=',')
-                    else:
-                        df = pd.read_csv(file_path)
-                    data[key] = df
-                except Exception as csv_e:
-                    st.error(f"Error cargando CSV para {key}: {csv_e}")
-                    data[key] = pd.DataFrame()
-    
+        return get_connection()
     except Exception as conn_error:
-        # If connection itself fails, use all CSVs
-        st.warning(f"⚠️ No se pudo conectar a Supabase. Usando todos los archivos CSV locales.")
-        
-        for key, filename in files.items():
-            file_path = os.path.join(DATA_PATH, filename)
-            try:
-                if key == "importaciones":
-                    df = pd.read_csv(file_path, sep=';', decimal=',')
-                else:
-                    df = pd.read_csv(file_path)
-                data[key] = df
-            except Exception as e:
-                st.error(f"Error loading {filename}: {e}")
-                data[key] = pd.DataFrame()
-            
+        # If connection itself fails, use the CSVs
+        notices.append(("warning", "⚠️ No se pudo conectar a Supabase. Usando todos los archivos CSV locales."))
+        return None
+
+def _load_one(key):
+    """
+    Loads one table: a fresh snapshot is memory-mapped; otherwise the table
+    comes from Supabase (incrementally, see data.sync) or its CSV.
+    Returns (DataFrame, notices); the caller shows the notices.
+    """
+    notices = []
+    df = _load_fresh_snapshot(key)
+    if df is None:
+        df = _load_table(_connect(notices), key, notices)
+    return df, notices
+
+def _entry(key, df, notices):
+    meta = read_snapshot_meta(TABLES[key])
+    return TableEntry(df, notices, data_version({key: df}), meta.get("written_at") if meta else None)
+
+def _load_concurrently(keys):
+    """
+    Loads the given tables on a bounded thread pool.
+    A table whose worker has been running longer than TABLE_TIMEOUT is
+    abandoned and loaded from CSV instead, so the total latency is roughly
+    that of the slowest table.
+    Returns {key: (DataFrame, notices)}.
+    """
+    data = {}
+    started = {}
+    ctx = get_script_run_ctx()
+
+    def run(key):
+        add_script_run_ctx(ctx=ctx)
+        started[key] = time.monotonic()
+        with timed("load", key, cached=True) as record:
+            note_miss()
+            df, notices = _load_one(key)
+            record.rows = len(df)
+        return df, notices
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(keys))))
+    futures = {executor.submit(run, key): key for key in keys}
+    try:
+        while futures:
+            done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                data[futures.pop(future)] = future.result()
+
+            now = time.monotonic()
+            for future, key in list(futures.items()):
+                if key in started and now - started[key] > TABLE_TIMEOUT:
+                    del futures[future]
+                    notices = [("warning", f"⚠️ '{TABLES[key]}' tardó demasiado. Usando CSV local.")]
+                    data[key] = (_load_csv_or_snapshot(key, notices), notices)
+    finally:
+        # Do not block on abandoned (timed out) workers
+        executor.shutdown(wait=False, cancel_futures=True)
     return data
+
+def refresh_tables(store):
+    """
+    One background refresh round: reloads every table in the store whose
+    snapshot is stale or was rewritten (Supabase TTL, changed CSV) and
+    swaps in those whose content changed. Content is compared on the
+    version of every value (data_version), so an edit anywhere in the
+    table is swapped in, while a re-ingest of identical data is not
+    reprocessed. Listeners (processing) are given the new tables first,
+    so the swap is the only thing requests see.
+    Returns the keys that changed.
+    """
+    current = store.current()
+    updates, rewritten = {}, {}
+    for key, entry in current.items():
+        meta = read_snapshot_meta(TABLES[key])
+        source_path = os.path.join(DATA_PATH, FILES[key]) if meta and meta.get("source") == "csv" else None
+        if meta is not None and entry.written_at == meta.get("written_at") and is_fresh(meta, source_path=source_path):
+            # Still serving the current snapshot
+            continue
+        with timed("refresh", key) as record:
+            df, notices = _load_one(key)
+            record.rows = len(df)
+        new_entry = _entry(key, df, notices)
+        if new_entry.version != entry.version:
+            updates[key] = new_entry
+        else:
+            # Same content: keep serving (and processed for) the current
+            # frame, matched to the rewritten snapshot
+            rewritten[key] = TableEntry(entry.df, new_entry.notices, entry.version, new_entry.written_at)
+    if updates:
+        frames = {key: entry.df for key, entry in {**current, **updates}.items()}
+        store.prepare(frames)
+    if updates or rewritten:
+        # Entries are replaced, never modified in place (see TableStore)
+        store.swap({**rewritten, **updates})
+    return list(updates)
+
+@st.cache_resource(show_spinner=False)
+def get_table_store():
+    """
+    Process-wide TableStore, plus its background refresher when
+    REFRESH_INTERVAL > 0.
+    """
+    store = TableStore()
+    if REFRESH_INTERVAL > 0:
+        start_refresher(lambda: refresh_tables(store), REFRESH_INTERVAL)
+    return store
+
+def load_tables(keys):
+    """
+    Loads only the given tables.
+    Loaded tables are kept in the process-wide TableStore, so a page pays
+    only for the tables it uses and switching pages reuses whatever is
+    already loaded. A background refresher (data.refresh) reloads them when
+    the source changes and swaps the new version in: requests are always
+    served the current tables and never wait for a reload.
+    Each table is kept as a local Arrow snapshot that is memory-mapped on
+    startup; Supabase/CSV are only hit when the snapshot is missing or stale.
+    Tables not loaded yet are fetched concurrently (MAX_WORKERS) with a
+    per-table timeout.
+    Returns a dictionary of DataFrames in TABLES order.
+    """
+    keys = [key for key in TABLES if key in keys]
+    store = get_table_store()
+    tables = store.current()
+    
+    missing = [key for key in keys if key not in tables]
+    if missing:
+        loaded = _load_concurrently(missing)
+        store.swap({key: _entry(key, df, notices) for key, (df, notices) in loaded.items()})
+        tables = store.current()
+    for key in keys:
+        if key not in missing:
+            with timed("load", key, cached=True) as record:
+                record.rows = len(tables[key].df)
+    
+    # Several tables may report the same problem (e.g. no connection)
+    notices = [notice for key in keys for notice in tables[key].notices]
+    for level, message in dict.fromkeys(notices):
+        getattr(st, level)(message)
+            
+    return {key: tables[key].df for key in keys}
+
+def load_data():
+    """
+    Loads all necessary data from Supabase.
+    Falls back to CSV files if connection fails.
+    Returns a dictionary of DataFrames (see load_tables).
+    """
+    return load_tables(TABLES)
+
+# Content digests of the loaded frames, by object: frames are never
+# modified, so each one is hashed once and not on every rerun
+_digests = {}
+_digests_lock = threading.Lock()
+
+def _update_digest(h, array):
+    # Arrow buffers of a column (zero-copy for numeric, date and Arrow
+    # string columns), fed to the hash as they are
+    for chunk in getattr(array, "chunks", [array]):
+        if pa.types.is_dictionary(chunk.type):
+            _update_digest(h, chunk.indices)
+            _update_digest(h, chunk.dictionary)
+            continue
+        h.update(f"{chunk.type}|{chunk.offset}|{len(chunk)}".encode())
+        for buffer in chunk.buffers():
+            if buffer is not None:
+                h.update(buffer)
+
+def frame_digest(df):
+    """
+    Hash of every value of a DataFrame (plus its columns and dtypes).
+    Memoized per frame object for as long as the frame is alive.
+    """
+    with _digests_lock:
+        cached = _digests.get(id(df))
+        if cached is not None and cached[0]() is df:
+            return cached[1]
+    h = hashlib.sha1(f"{df.shape}|{list(df.columns)}|{list(map(str, df.dtypes))}".encode())
+    for col in df.columns:
+        try:
+            _update_digest(h, pa.array(df[col], from_pandas=True))
+        except (pa.ArrowException, TypeError, ValueError):
+            # Mixed-type object column
+            h.update(pd.util.hash_pandas_object(df[col], index=False).values.tobytes())
+    digest = h.hexdigest()
+    with _digests_lock:
+        _digests[id(df)] = (weakref.ref(df, lambda _, key=id(df): _digests.pop(key, None)), digest)
+    return digest
+
+def data_version(data):
+    """
+    Content version of a dict of DataFrames: changes whenever any value of
+    any table changes (appends, edits in the middle, schema changes), so
+    processed results, shared files and refreshes keyed on it are never
+    served for other data.
+    """
+    h = hashlib.sha1()
+    for key in sorted(data):
+        h.update(f"{key}|{frame_digest(data[key])}".encode())
+    return h.hexdigest()
+
+def table_source(key):
+    """
+    Returns where the current copy of a table came from ("supabase" or
+    "csv"), based on its snapshot metadata; None if unknown.
+    """
+    meta = read_snapshot_meta(TABLES[key])
+    return meta.get("source") if meta else None
@@ -0,0 +1,87 @@
+import os
+import pickle
+import time
+
+import streamlit as st
+from utils.figure_cache import cached
+from utils.metrics import timed, note_miss
+
+# Configuration
+MATERIALIZED_PATH = os.environ.get(
+    "ANDINA_MATERIALIZED_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".materialized")
+)
+
+
+def store_file(view):
+    """Returns the path of the materialized results of a view."""
+    return os.path.join(MATERIALIZED_PATH, f"{view}.pkl")
+
+
+def filters_key(filters):
+    """
+    Canonical, hashable form of a view's filter values. None means "not
+    filtered" and is left out, so {} and {"segmento": None} are the same key.
+    """
+    return tuple(sorted((name, value) for name, value in filters.items() if value is not None))
+
+
+def write_results(view, version, results):
+    """
+    Stores a view's precomputed results ({filters_key: results}) for one
+    data version. The write is atomic (tmp file + rename), so a running
+    dashboard never reads a partial store. Returns True on success.
+    """
+    try:
+        os.makedirs(MATERIALIZED_PATH, exist_ok=True)
+        path = store_file(view)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"version": version, "written_at": time.time(), "results": results}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return True
+    except Exception:
+        return False
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _read_store(path, mtime):
+    # mtime is part of the key: a new precompute run is picked up
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def read_results(view, version):
+    """
+    Precomputed results of a view for this data version, or None if there
+    are none (not precomputed, or computed from other data).
+    """
+    path = store_file(view)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    store = _read_store(path, mtime)
+    if store is None or store.get("version") != version:
+        return None
+    return store["results"]
+
+
+def get_results(view, compute, data, **filters):
+    """
+    compute(data, **filters) served from the materialized store when it
+    holds these filters for this data version (see tools.precompute);
+    otherwise computed and memoized in the figure cache.
+    Results are shared: callers must not modify them.
+    """
+    with timed("results", view, cached=True):
+        store = read_results(view, getattr(data, "version", None))
+        key = filters_key(filters)
+        if store is not None and key in store:
+            return store[key]
+        note_miss()
+        return cached(view, "results", data, lambda: compute(data, **filters), filters=filters)
@@ -0,0 +1,66 @@
+import pandas as pd
+
+# Global period presets of the sidebar: label -> months up to the latest
+# month with data (None = whole history)
+PERIOD_PRESETS = {
+    "Todo el historial": None,
+    "Último trimestre": 3,
+    "Últimos 6 meses": 6,
+    "Último año": 12,
+}
+CUSTOM_PERIOD = "Personalizado"
+DEFAULT_PERIOD = "Todo el historial"
+
+
+def month_start(date):
+    """First day of the month of a date, as a Timestamp."""
+    return pd.Timestamp(date).to_period("M").to_timestamp()
+
+
+def resolve_period(choice, latest):
+    """
+    (desde, hasta) bounds of a sidebar period choice: rows with
+    desde <= date < hasta, whole months, None = unbounded.
+    choice is a preset label (counted back from latest, the last date
+    with data of the page) or a (first date, last date) custom range.
+    """
+    if isinstance(choice, (tuple, list)):
+        if len(choice) < 2:
+            return None, None
+        start, end = choice[0], choice[1]
+        return month_start(start), month_start(end) + pd.DateOffset(months=1)
+    months = PERIOD_PRESETS.get(choice)
+    if months is None or latest is None or pd.isna(latest):
+        return None, None
+    hasta = month_start(latest) + pd.DateOffset(months=1)
+    return hasta - pd.DateOffset(months=months), hasta
+
+
+def preset_periods(latest):
+    """Bounds of every bounded preset, for tools.precompute."""
+    return [resolve_period(label, latest) for label, months in PERIOD_PRESETS.items() if months is not None]
+
+
+def period_label(desde, hasta):
+    """Human-readable period (e.g. 'ene 2024 – mar 2024'), None if unbounded."""
+    if desde is None and hasta is None:
+        return None
+    months = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
+
+    def fmt(date):
+        return f"{months[date.month - 1]} {date.year}"
+
+    first = fmt(desde) if desde is not None else "inicio"
+    last = fmt(hasta - pd.DateOffset(months=1)) if hasta is not None else "hoy"
+    return f"{first} – {last}"
+
+
+def date_bounds(values, desde=None, hasta=None):
+    """
+    Positions [lo, hi) of the dates in [desde, hasta) within sorted
+    datetime64 values (binary search; NaT sorts last and is excluded by
+    any upper bound).
+    """
+    lo = 0 if desde is None else int(values.searchsorted(pd.Timestamp(desde).to_datetime64(), side="left"))
+    hi = len(values) if hasta is None else int(values.searchsorted(pd.Timestamp(hasta).to_datetime64(), side="left"))
+    return lo, max(lo, hi)
@@ -1,70 +1,249 @@
+import hashlib
+import threading
 import pandas as pd
 import streamlit as st
+from data.loader import TABLES, data_version, get_table_store, load_tables
+from data.schema import compact_data, date_columns
+from data.shared_store import shared_frame, shared_object
+from data.star import build_sales_star
+from data.cube import build_sales_cube
+from data.filters import build_partition_index
+from data.aging import build_aging
+from data.inventory_store import build_inventory_store
+from data.queries import deferred_version
+from utils.metrics import timed, note_miss
 
-def process_data(data):
+class ProcessedData(dict):
     """
-    Process and clean the loaded data.
-    Performs date conversions, numeric cleaning, and merges datasets for analysis.
-    """
-    # 1. Convert Dates
-    date_cols = {
-        "cartera": ["fecha_factura", "fecha_vencimiento"],
-        "clientes": ["fecha_alta"],
-        "importaciones": ["fecha_orden", "fecha_llegada"],
-        "inventario": ["fecha_corte"],
-        "ventas": ["fecha"]
+    Dictionary of processed DataFrames tagged with the version of the raw
+    data it was built from. Instances are cached and shared across sessions,
+    so views must treat them as read-only.
+    memory_report holds the per-table memory before/after compaction.
+    """
+    def __init__(self, frames, version, memory_report=None):
+        super().__init__(frames)
+        self.version = version
+        self.memory_report = memory_report
+
+class DeferredData(ProcessedData):
+    """
+    ProcessedData of a page whose aggregations run in the database (see
+    data.queries.deferred_version): it starts empty, tagged with the server
+    version, and each declared dataset is loaded and processed the first
+    time something reads it (a failed query's fallback, a view reading
+    rows). Membership tests answer for the declared datasets without
+    loading them.
+    """
+    def __init__(self, datasets, version):
+        super().__init__({}, version)
+        self.datasets = list(datasets)
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.datasets or dict.__contains__(self, name)
+
+    def __missing__(self, name):
+        if name not in self.datasets:
+            raise KeyError(name)
+        with self._lock:
+            if not dict.__contains__(self, name):
+                tables, _ = resolve([name])
+                loaded = get_processed_data(load_tables(tables), [name])
+                self.update(loaded)
+                reports = [r for r in (self.memory_report, loaded.memory_report) if r is not None]
+                self.memory_report = pd.concat(reports, ignore_index=True).drop_duplicates("tabla", keep="last") if reports else None
+        return dict.__getitem__(self, name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+# Date columns parsed per raw table
+DATE_COLUMNS = {key: date_columns(key) for key in TABLES}
+
+def process_table(key, df):
+    """
+    Cleans one raw table: date conversions and numeric cleaning.
+    The input DataFrame is never modified; a new one is returned.
+    """
+    # 1. Convert Dates (CSV exports already come parsed, see data.ingest)
+    converted = {
+        col: pd.to_datetime(df[col], errors='coerce')
+        for col in DATE_COLUMNS.get(key, [])
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col])
     }
-    
-    for key, cols in date_cols.items():
-        if key in data:
-            df = data[key]
-            for col in cols:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-            data[key] = df
+    df = df.assign(**converted)
 
     # 2. Numeric Cleaning (if necessary)
     # Check for comma decimals in importaciones if they exist as strings
-    if "importaciones" in data:
-        df = data["importaciones"]
+    if key == "importaciones":
         numeric_cols = ["costo_mercancia_usd", "flete_usd", "arancel_cop", "otros_costos_cop"]
-        for col in numeric_cols:
-            if col in df.columns and df[col].dtype == 'object':
-                 df[col] = df[col].str.replace(',', '.', regex=False).astype(float)
-        data["importaciones"] = df
-
-    # 3. Merge Data for easier analysis
-    # Create a master sales table: Sales + Product Info + Customer Info
-    if "ventas" in data and "productos" in data and "clientes" in data:
-        sales = data["ventas"].copy()
-        products = data["productos"].copy()
-        customers = data["clientes"].copy()
-        
-        # Merge with products (left join to keep all sales)
-        # Suffix collisions: 'categoria', 'subcategoria' exist in both. 
-        # We prefer the ones from Product master if available, or keep Sales ones if they differ.
-        # Usually Sales snapshot might differ from Master. Let's keep Sales as is, and add Product Master info with suffix.
-        sales_enriched = sales.merge(
-            products, 
-            on="producto_id", 
-            how="left", 
-            suffixes=("", "_master")
-        )
-        
-        # Merge with customers
-        # 'region', 'ciudad', 'segmento' exist in both.
-        sales_enriched = sales_enriched.merge(
-            customers, 
-            on="cliente_id", 
-            how="left", 
-            suffixes=("", "_master")
-        )
-        
-        # Calculate calculated fields if missing
-        # e.g. Margin %
-        if "margen_total_cop" in sales_enriched.columns and "subtotal_cop" in sales_enriched.columns:
-            sales_enriched["margen_pct"] = (sales_enriched["margen_total_cop"] / sales_enriched["subtotal_cop"]).fillna(0)
-            
-        data["ventas_enriched"] = sales_enriched
-        
+        converted = {
+            col: df[col].str.replace(',', '.', regex=False).astype(float)
+            for col in numeric_cols
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col])
+        }
+        df = df.assign(**converted)
+    return df
+
+def _cartera_aging(cartera):
+    # Receivables aging (buckets, overdue subset, per-region/client totals)
+    if {"dias_mora", "saldo_cop"}.issubset(cartera.columns):
+        return build_aging(cartera)
+    return None
+
+def _inventario_store(inventario):
+    # Inventory partitioned by fecha_corte (latest snapshot + per-cutoff totals)
+    if "fecha_corte" in inventario.columns:
+        return build_inventory_store(inventario)
+    return None
+
+def _ventas_index(ventas_star):
+    # Common filter dimensions plus the sale date (global period filter)
+    return build_partition_index(ventas_star, date_col="fecha")
+
+def _importaciones_index(importaciones):
+    # Order date only: the period filter of the imports page
+    return build_partition_index(importaciones, dims=[], date_col="fecha_orden")
+
+# Derived datasets: name -> (inputs, builder). Inputs are raw tables or
+# other derived datasets; builders get them positionally and may return
+# None when the inputs lack the needed columns.
+DERIVED = {
+    "cartera_aging": (["cartera"], _cartera_aging),
+    "inventario_store": (["inventario"], _inventario_store),
+    # Sales fact table with lazily joined product/customer dimensions
+    "ventas_star": (["ventas", "productos", "clientes"], build_sales_star),
+    # Rollup cube the views query instead of the raw rows
+    "ventas_cube": (["ventas_star"], build_sales_cube),
+    # Partition index for the common filters (segmento, categoria, ...)
+    "ventas_star_index": (["ventas_star"], _ventas_index),
+    "importaciones_index": (["importaciones"], _importaciones_index),
+}
+
+def resolve(names):
+    """
+    Expands the datasets a view declares into everything needed to build
+    them. Returns (raw table keys, derived dataset names in build order).
+    """
+    tables, derived = [], []
+
+    def visit(name):
+        if name in TABLES:
+            if name not in tables:
+                tables.append(name)
+        elif name in DERIVED and name not in derived:
+            for dep in DERIVED[name][0]:
+                visit(dep)
+            derived.append(name)
+
+    for name in names:
+        visit(name)
+    return tables, derived
+
+def process_data(data):
+    """
+    Process and clean the loaded data.
+    Performs date conversions, numeric cleaning, and builds the sales star schema.
+    Every derived dataset whose inputs are present is built.
+    The input dictionary and its DataFrames are never modified; a new
+    dictionary is returned.
+    """
+    data = {key: process_table(key, df) for key, df in data.items()}
+    for name, (inputs, build) in DERIVED.items():
+        if all(dep in data for dep in inputs):
+            value = build(*[data[dep] for dep in inputs])
+            if value is not None:
+                data[name] = value
     return data
+
+@st.cache_resource(max_entries=len(TABLES) * 2, show_spinner=False)
+def _process_table_version(key, version, _df):
+    # _df is not hashed by Streamlit; the version identifies it
+    note_miss()
+    def build():
+        compacted, memory_report = compact_data({key: _df})
+        return process_table(key, compacted[key]), {"memory_report": memory_report.to_dict("records")}
+    frame, meta = shared_frame(key, version, build)
+    return frame, pd.DataFrame(meta.get("memory_report", []))
+
+@st.cache_resource(max_entries=len(DERIVED) * 2, show_spinner=False)
+def _derive_version(name, version, _inputs):
+    # version combines the versions of the inputs
+    note_miss()
+    inputs, build = DERIVED[name]
+    args = [_inputs[dep] for dep in inputs]
+    # Written once per version; every worker wraps the mapped frames
+    return shared_object(name, version, lambda: build(*args), args)
+
+def _combine(versions):
+    return hashlib.sha1(repr(versions).encode()).hexdigest()
+
+def get_processed_data(data, datasets=None):
+    """
+    Memoized processing of the loaded tables in data: each table is
+    compacted (categoricals, downcast ids, Arrow strings) and cleaned once
+    per data version (see data.loader.data_version), and each derived
+    dataset is built once per version of its inputs.
+    datasets limits the derived datasets to those (and their dependencies);
+    by default every one whose inputs were loaded is built.
+    Returns the same read-only ProcessedData content on every rerun until
+    the loaded data changes.
+    Processed frames are shared with the other worker processes on the
+    host through memory-mapped Arrow files (see data.shared_store).
+    """
+    versions, frames, reports = {}, {}, []
+    for key, df in data.items():
+        versions[key] = data_version({key: df})
+        with timed("process", key, cached=True) as record:
+            frames[key], report = _process_table_version(key, versions[key], df)
+            record.rows = len(frames[key])
+        reports.append(report)
+
+    derived = resolve(DERIVED if datasets is None else datasets)[1]
+    for name in derived:
+        inputs = DERIVED[name][0]
+        if not all(dep in frames for dep in inputs):
+            continue
+        versions[name] = _combine([versions[dep] for dep in inputs])
+        with timed("derive", name, cached=True) as record:
+            value = _derive_version(name, versions[name], {dep: frames[dep] for dep in inputs})
+            record.rows = len(value) if isinstance(value, pd.DataFrame) else None
+        if value is not None:
+            frames[name] = value
+
+    memory_report = pd.concat(reports, ignore_index=True) if reports else None
+    return ProcessedData(frames, _combine(sorted(versions.items())), memory_report)
+
+# Dataset lists requested by the views, rebuilt ahead of each refresh
+_requested = set()
+
+def _warm(frames):
+    """
+    Processes a refreshed set of tables before it is swapped in (see
+    data.loader.refresh_tables), so no request pays for reprocessing.
+    """
+    for datasets in list(_requested):
+        tables, _ = resolve(datasets)
+        if all(key in frames for key in tables):
+            get_processed_data({key: frames[key] for key in tables}, list(datasets))
+
+def load_datasets(datasets):
+    """
+    Loads and processes only what the given datasets need (a view's
+    REQUIRES): their raw tables are loaded lazily, each cached on its own,
+    and only those derived datasets are built.
+    When the database answers the aggregations over those tables, nothing
+    is loaded up front: a DeferredData is returned instead.
+    """
+    _requested.add(tuple(datasets))
+    get_table_store().add_listener(_warm)
+    tables, _ = resolve(datasets)
+    version = deferred_version(tables)
+    if version is not None:
+        # The database answers the page's aggregations: nothing is loaded
+        # until a dataset is actually read
+        return DeferredData(datasets, version)
+    return get_processed_data(load_tables(tables), datasets)
@@ -0,0 +1,419 @@
+import hashlib
+import logging
+
+import pandas as pd
+import streamlit as st
+from data.loader import TABLES, table_source
+from data.db import fetch_row, get_connection, query_slot, version_statement
+from data.sync import SYNC_SPECS
+from data.engine import VENTAS_ENRICHED_SQL, engine_enabled, engine_query, engine_version
+from data.aging import AGING_EDGES, aging_labels
+from utils.figure_cache import cached
+from utils.metrics import timed, note_miss
+
+# Configuration
+PUSHDOWN_ENABLED = True
+QUERY_TTL = 600
+
+logger = logging.getLogger(__name__)
+
+# --- Pandas fallbacks (used when the data came from CSV) ---
+# Each returns the same columns as its SQL counterpart.
+
+def _filters(**values):
+    # None means "no filter" (e.g. "Todos")
+    return {col: value for col, value in values.items() if value is not None}
+
+def _sales_kpis(data, desde=None, hasta=None):
+    cube = data["ventas_cube"]
+    return pd.DataFrame([{
+        "total_sales": cube.total("subtotal_cop", desde=desde, hasta=hasta),
+        "total_profit": cube.total("margen_total_cop", desde=desde, hasta=hasta),
+    }])
+
+def _monthly_sales(data, desde=None, hasta=None):
+    return data["ventas_cube"].query("mes", measures=["subtotal_cop"], sort="mes", ascending=True, desde=desde, hasta=hasta)
+
+def _region_sales(data, desde=None, hasta=None):
+    return data["ventas_cube"].query("region", measures=["subtotal_cop"], sort="subtotal_cop", desde=desde, hasta=hasta)
+
+def _top_products(data, top, desde=None, hasta=None):
+    # Use description if available, else ID
+    prod_col = "descripcion" if "descripcion" in data["ventas_star"].columns else "producto_id"
+    return data["ventas_cube"].query(prod_col, measures=["subtotal_cop"], sort="subtotal_cop", top=top, desde=desde, hasta=hasta)
+
+def _segment_sales(data, segmento, desde=None, hasta=None):
+    return data["ventas_cube"].query("segmento", filters=_filters(segmento=segmento), measures=["subtotal_cop"], desde=desde, hasta=hasta)
+
+def _city_sales(data, segmento, desde=None, hasta=None):
+    return data["ventas_cube"].query("ciudad", filters=_filters(segmento=segmento), measures=["subtotal_cop"], sort="subtotal_cop", desde=desde, hasta=hasta)
+
+def _top_customers(data, segmento, top, desde=None, hasta=None):
+    client_name_col = "nombre_cliente" if "nombre_cliente" in data["ventas_star"].columns else "cliente_id"
+    return data["ventas_cube"].query(
+        list(dict.fromkeys(["cliente_id", client_name_col])),
+        filters=_filters(segmento=segmento),
+        measures=["subtotal_cop", "margen_total_cop", "transacciones"],
+        sort="subtotal_cop",
+        top=top,
+        desde=desde,
+        hasta=hasta
+    )
+
+def _margin_by_subcategory(data, categoria, desde=None, hasta=None):
+    return data["ventas_cube"].query("subcategoria", filters=_filters(categoria=categoria), measures=["margen_total_cop"], sort="margen_total_cop", desde=desde, hasta=hasta)
+
+def _sku_stats(data, categoria, desde=None, hasta=None):
+    return data["ventas_cube"].query(
+        ["producto_id", "descripcion", "categoria"],
+        filters=_filters(categoria=categoria),
+        measures=["subtotal_cop", "margen_total_cop", "cantidad"],
+        desde=desde,
+        hasta=hasta
+    )
+
+def _last_month(data):
+    return pd.DataFrame({"mes": [data["ventas_cube"].last_month()]})
+
+def _segments(data):
+    return pd.DataFrame({"segmento": data["ventas_cube"].members("segmento")})
+
+def _categories(data):
+    return pd.DataFrame({"categoria": data["ventas_cube"].members("categoria")})
+
+def _active_customers(data):
+    # From the customer master if available, else from the sales
+    if "clientes" in data:
+        clientes = data["clientes"]
+        return pd.DataFrame({"clientes_activos": [int((clientes["estado"] == "Activo").sum())]})
+    return pd.DataFrame({"clientes_activos": [int(data["ventas_star"]["cliente_id"].nunique())]})
+
+def _receivables_kpis(data):
+    return data["cartera_aging"].kpis
+
+def _aging_summary(data):
+    return data["cartera_aging"].summary
+
+def _region_risk(data):
+    return data["cartera_aging"].by_region
+
+def _top_delinquent(data, top):
+    return data["cartera_aging"].top_delinquent(top)
+
+def _aging_summary_sql(edges=AGING_EDGES):
+    """Aging buckets as SQL, generated from the same edges as data.aging."""
+    labels = aging_labels(edges)
+    values = ", ".join(f"('{label}', {i})" for i, label in enumerate(labels))
+    # Unknown days past due get no bucket, as in data.aging.bucket_aging
+    whens = "\n".join(
+        ["            WHEN c.dias_mora IS NULL THEN NULL"]
+        + [f"            WHEN c.dias_mora <= {edge} THEN '{label}'" for edge, label in zip(edges, labels)]
+    )
+    return f"""
+        WITH buckets(aging_bucket, orden) AS (
+            VALUES {values}
+        )
+        SELECT b.aging_bucket, CAST(COALESCE(SUM(c.saldo_cop), 0) AS double precision) AS saldo_cop
+        FROM buckets b
+        LEFT JOIN cartera_andina c ON b.aging_bucket = CASE
+{whens}
+            ELSE '{labels[-1]}'
+        END
+        GROUP BY b.aging_bucket, b.orden
+        ORDER BY b.orden
+        """
+
+# Global period of the sales aggregations (see data.periods): sales with
+# desde <= fecha < hasta; None bounds are open
+PERIOD_SQL = """(CAST(:desde AS timestamp) IS NULL OR fecha >= CAST(:desde AS timestamp))
+          AND (CAST(:hasta AS timestamp) IS NULL OR fecha < CAST(:hasta AS timestamp))"""
+
+# --- Registry: name -> (SQL, source tables, pandas fallback) ---
+# SQL runs on Supabase (PostgreSQL) or on the embedded engine (DuckDB)
+# with bound parameters (:name); a None filter parameter means "all".
+# ventas_enriched is a view in the engine and a CTE on Supabase.
+# Sums are cast to double precision so results have the same dtypes as
+# the pandas path instead of Decimal objects.
+AGGREGATIONS = {
+    # Period and filter options of the sales pages
+    "ventas.last_month": (
+        """
+        SELECT date_trunc('month', CAST(MAX(fecha) AS timestamp)) AS mes
+        FROM ventas_andina
+        """,
+        ["ventas"],
+        _last_month,
+    ),
+    "ventas.segments": (
+        """
+        SELECT DISTINCT segmento FROM ventas_andina WHERE segmento IS NOT NULL
+        """,
+        ["ventas"],
+        _segments,
+    ),
+    "ventas.categories": (
+        """
+        SELECT DISTINCT categoria FROM ventas_andina WHERE categoria IS NOT NULL
+        """,
+        ["ventas"],
+        _categories,
+    ),
+    "overview.active_customers": (
+        """
+        SELECT COUNT(*) AS clientes_activos FROM clientes_andina WHERE estado = 'Activo'
+        """,
+        ["clientes"],
+        _active_customers,
+    ),
+    "overview.kpis": (
+        f"""
+        SELECT CAST(COALESCE(SUM(subtotal_cop), 0) AS double precision) AS total_sales,
+               CAST(COALESCE(SUM(margen_total_cop), 0) AS double precision) AS total_profit
+        FROM ventas_andina
+        WHERE {PERIOD_SQL}
+        """,
+        ["ventas"],
+        _sales_kpis,
+    ),
+    "overview.monthly_sales": (
+        f"""
+        SELECT date_trunc('month', CAST(fecha AS timestamp)) AS mes,
+               CAST(SUM(subtotal_cop) AS double precision) AS subtotal_cop
+        FROM ventas_andina
+        WHERE {PERIOD_SQL}
+        GROUP BY 1
+        ORDER BY 1
+        """,
+        ["ventas"],
+        _monthly_sales,
+    ),
+    "overview.region_sales": (
+        f"""
+        SELECT region, CAST(SUM(subtotal_cop) AS double precision) AS subtotal_cop
+        FROM ventas_andina
+        WHERE {PERIOD_SQL}
+        GROUP BY region
+        ORDER BY 2 DESC
+        """,
+        ["ventas"],
+        _region_sales,
+    ),
+    "overview.top_products": (
+        f"""
+        SELECT p.descripcion, CAST(SUM(v.subtotal_cop) AS double precision) AS subtotal_cop
+        FROM ventas_andina v
+        JOIN productos_andina p ON p.producto_id = v.producto_id
+        WHERE {PERIOD_SQL}
+        GROUP BY p.descripcion
+        ORDER BY 2 DESC
+        LIMIT :top
+        """,
+        ["ventas", "productos"],
+        _top_products,
+    ),
+    "customers.segment_sales": (
+        f"""
+        SELECT segmento, CAST(SUM(subtotal_cop) AS double precision) AS subtotal_cop
+        FROM ventas_enriched
+        WHERE (:segmento IS NULL OR segmento = :segmento)
+          AND {PERIOD_SQL}
+        GROUP BY segmento
+        """,
+        ["ventas", "productos", "clientes"],
+        _segment_sales,
+    ),
+    "customers.city_sales": (
+        f"""
+        SELECT ciudad, CAST(SUM(subtotal_cop) AS double precision) AS subtotal_cop
+        FROM ventas_enriched
+        WHERE (:segmento IS NULL OR segmento = :segmento)
+          AND {PERIOD_SQL}
+        GROUP BY ciudad
+        ORDER BY 2 DESC
+        """,
+        ["ventas", "productos", "clientes"],
+        _city_sales,
+    ),
+    "customers.top_customers": (
+        f"""
+        SELECT cliente_id, nombre_cliente,
+               CAST(SUM(subtotal_cop) AS double precision) AS subtotal_cop,
+               CAST(SUM(margen_total_cop) AS double precision) AS margen_total_cop,
+               COUNT(*) AS transacciones
+        FROM ventas_enriched
+        WHERE (:segmento IS NULL OR segmento = :segmento)
+          AND {PERIOD_SQL}
+        GROUP BY cliente_id, nombre_cliente
+        ORDER BY 3 DESC
+        LIMIT :top
+        """,
+        ["ventas", "productos", "clientes"],
+        _top_customers,
+    ),
+    "profitability.margin_by_subcategory": (
+        f"""
+        SELECT subcategoria, CAST(SUM(margen_total_cop) AS double precision) AS margen_total_cop
+        FROM ventas_enriched
+        WHERE (:categoria IS NULL OR categoria = :categoria)
+          AND {PERIOD_SQL}
+        GROUP BY subcategoria
+        ORDER BY 2 DESC
+        """,
+        ["ventas", "productos", "clientes"],
+        _margin_by_subcategory,
+    ),
+    "profitability.sku_stats": (
+        f"""
+        SELECT producto_id, descripcion, categoria,
+               CAST(SUM(subtotal_cop) AS double precision) AS subtotal_cop,
+               CAST(SUM(margen_total_cop) AS double precision) AS margen_total_cop,
+               SUM(cantidad) AS cantidad
+        FROM ventas_enriched
+        WHERE (:categoria IS NULL OR categoria = :categoria)
+          AND {PERIOD_SQL}
+        GROUP BY producto_id, descripcion, categoria
+        """,
+        ["ventas", "productos", "clientes"],
+        _sku_stats,
+    ),
+    "credit_risk.kpis": (
+        """
+        SELECT CAST(COALESCE(SUM(saldo_cop), 0) AS double precision) AS total_receivables,
+               CAST(COALESCE(SUM(saldo_cop) FILTER (WHERE dias_mora > 0), 0) AS double precision) AS overdue_receivables
+        FROM cartera_andina
+        """,
+        ["cartera"],
+        _receivables_kpis,
+    ),
+    "credit_risk.aging_summary": (
+        _aging_summary_sql(),
+        ["cartera"],
+        _aging_summary,
+    ),
+    "credit_risk.region_risk": (
+        """
+        SELECT region, CAST(SUM(saldo_cop) AS double precision) AS saldo_cop
+        FROM cartera_andina
+        WHERE dias_mora > 0
+        GROUP BY region
+        ORDER BY 2 DESC
+        """,
+        ["cartera"],
+        _region_risk,
+    ),
+    "credit_risk.top_delinquent": (
+        """
+        SELECT cliente_id, documento_id,
+               CAST(SUM(saldo_cop) AS double precision) AS saldo_cop,
+               MAX(dias_mora) AS dias_mora
+        FROM cartera_andina
+        WHERE dias_mora > 0
+        GROUP BY cliente_id, documento_id
+        ORDER BY 3 DESC
+        LIMIT :top
+        """,
+        ["cartera"],
+        _top_delinquent,
+    ),
+}
+
+def pushdown_available(tables):
+    """
+    SQL pushdown is only used when the tables involved come from Supabase;
+    tables loaded from the CSV exports are aggregated in pandas.
+    """
+    return PUSHDOWN_ENABLED and all(table_source(key) != "csv" for key in tables)
+
+@st.cache_resource(ttl=QUERY_TTL, show_spinner=False)
+def _server_version(tables):
+    # Row count and high-water mark of every table: a sync that adds,
+    # removes or backdates rows changes it. Checked at most every QUERY_TTL,
+    # as often as the pushed-down results themselves expire
+    conn = get_connection()
+    marks = [
+        (key, fetch_row(conn, version_statement(TABLES[key], SYNC_SPECS.get(key, {}).get("watermark"))))
+        for key in tables
+    ]
+    return hashlib.sha1(repr(marks).encode()).hexdigest()
+
+def deferred_version(tables):
+    """
+    Version to key the results of a page on without loading its tables,
+    or None when they have to be loaded.
+    Tables the registered aggregations read are not loaded while pushdown
+    is available or the embedded engine is on: they answer them, so only a
+    failed query (its fallback) or a view reading a dataset itself needs
+    the rows. The version then comes from the server (row count +
+    high-water mark per table) or from the files the engine scans
+    (data.engine.engine_version) instead of the content of loaded copies.
+    """
+    read = {key for _, sources, _ in AGGREGATIONS.values() for key in sources}
+    if not tables or not set(tables) <= read:
+        return None
+    if pushdown_available(tables):
+        try:
+            return _server_version(tuple(tables))
+        except Exception:
+            logger.warning("No se pudo leer la versión de %s en Supabase; se cargan las tablas", tables, exc_info=True)
+            return None
+    if engine_enabled():
+        return engine_version(tables)
+    return None
+
+def last_sales_month(data):
+    """Latest month with sales, None if there is none (see data.periods)."""
+    month = run_aggregation("ventas.last_month", data)["mes"].iloc[0]
+    return None if pd.isna(month) else pd.Timestamp(month)
+
+def sales_members(data, dim):
+    """Sorted distinct values of a sales dimension ("segmento" or "categoria")."""
+    name = {"segmento": "ventas.segments", "categoria": "ventas.categories"}[dim]
+    return sorted(run_aggregation(name, data)[dim].dropna())
+
+def run_aggregation(name, data, **params):
+    """
+    Runs a registered aggregation.
+    The database computes it when the data came from Supabase, returning only
+    the small result set. Otherwise it runs on the embedded engine when
+    ANDINA_ENGINE=duckdb, and else (or if a query fails) the pandas
+    fallback computes the same result from the processed data; failed
+    queries are logged and show up as misses in the metrics panel.
+    Results are memoized per (name, data version, params) in the shared
+    figure/aggregate cache.
+    """
+    return cached("aggregation", name, data, lambda: _run_aggregation(name, data, **params), filters=params)
+
+def _run_sql(kind, name, run):
+    """
+    Runs a query of one engine ("pushdown" or "engine") as a timed section:
+    a hit when it answered, a miss (logged) when it failed and the pandas
+    fallback had to compute the result. Returns None on failure.
+    """
+    with timed(kind, name, cached=True) as record:
+        try:
+            result = run()
+        except Exception:
+            note_miss()
+            logger.warning("La consulta '%s' (%s) falló; se calcula en pandas", name, kind, exc_info=True)
+            return None
+        record.rows = len(result)
+        return result
+
+def _run_aggregation(name, data, **params):
+    sql, tables, fallback = AGGREGATIONS[name]
+    result = None
+    if pushdown_available(tables):
+        if "ventas_enriched" in sql:
+            sql = f"WITH ventas_enriched AS ({VENTAS_ENRICHED_SQL}) {sql}"
+
+        def run():
+            conn = get_connection()
+            with query_slot():
+                return conn.query(sql, params=params or None, ttl=QUERY_TTL)
+
+        result = _run_sql("pushdown", name, run)
+    elif engine_enabled():
+        result = _run_sql("engine", name, lambda: engine_query(sql, params))
+    if result is not None:
+        return result
+    return fallback(data, **params)
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+# Seconds between background checks for changed source data (0 = off:
+# loaded tables are then kept until the process restarts)
+REFRESH_INTERVAL = int(os.environ.get("ANDINA_REFRESH_INTERVAL", 60))
+
+
+class TableEntry:
+    """A loaded table with what is needed to tell when it changed."""
+    def __init__(self, df, notices, version, written_at=None):
+        self.df = df
+        self.notices = notices
+        self.version = version
+        self.written_at = written_at  # of the snapshot it matches, if any
+
+
+class TableStore:
+    """
+    Process-wide current version of each loaded table.
+    The table dictionary is never modified in place: updates build a new
+    one and swap the reference, so a reader that takes current() once sees
+    a consistent set of tables even while a refresh is being swapped in.
+    """
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def current(self):
+        return self._tables
+
+    def swap(self, entries):
+        """Atomically replaces (or adds) the given {key: TableEntry}."""
+        with self._lock:
+            self._tables = {**self._tables, **entries}
+
+    def clear(self):
+        with self._lock:
+            self._tables = {}
+
+    def add_listener(self, fn):
+        """fn({key: DataFrame}) runs before a refresh is swapped in."""
+        with self._lock:
+            if fn not in self._listeners:
+                self._listeners.append(fn)
+
+    def prepare(self, frames):
+        # Listeners warm their caches for the new version; a failing one
+        # only means that work happens on the next request instead
+        for fn in list(self._listeners):
+            try:
+                fn(frames)
+            except Exception:
+                pass
+
+
+def start_refresher(refresh, interval=REFRESH_INTERVAL):
+    """
+    Runs refresh() every interval seconds on a daemon thread (stale while
+    revalidate: requests keep being served the current tables meanwhile).
+    Errors are swallowed; the next round retries.
+    """
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                refresh()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=loop, name="andina-refresher", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,162 @@
+import pandas as pd
+import pyarrow as pa
+
+STRING_DTYPE = "string[pyarrow]"
+
+# One schema per table: how its CSV export is written (field separator,
+# decimal mark) and the type of every column, so the reader (data.ingest)
+# parses every value once, in the right type, and the Supabase reader
+# (data.db) fetches and casts the same columns.
+# Column types:
+# - int: ids and counts, downcast to the smallest integer type that fits
+# - float: amounts. Monetary columns (*_cop, *_usd) are kept as float64
+#   on purpose: float32 would lose precision when summing millions of COP
+#   values. Read as float: some exports write them as "1000.0".
+# - date: parsed with CSV_DATE_FORMAT
+# - category: low-cardinality labels repeated across many rows
+# - string: free text / document ids, stored as Arrow-backed strings
+# Columns not listed are inferred from CSVs. "unread" lists the declared
+# columns no view or derived dataset reads: they are parsed from CSVs but
+# never fetched from Supabase, where only read_columns() are.
+CSV_DATE_FORMAT = "%Y-%m-%d"
+TABLE_SCHEMAS = {
+    "ventas": {
+        "columns": {
+            "venta_id": "int", "fecha": "date", "cliente_id": "int", "producto_id": "int",
+            "region": "category", "ciudad": "category", "segmento": "category",
+            "categoria": "category", "subcategoria": "category", "cantidad": "int",
+            "precio_unitario_cop": "float", "subtotal_cop": "float", "margen_total_cop": "float",
+        },
+    },
+    "clientes": {
+        "columns": {
+            "cliente_id": "int", "nombre_cliente": "string", "region": "category", "ciudad": "category",
+            "segmento": "category", "estado": "category", "fecha_alta": "date",
+        },
+        # The sales fact table carries its own region/ciudad/segmento
+        "unread": ["region", "ciudad", "segmento", "fecha_alta"],
+    },
+    "productos": {
+        "columns": {
+            "producto_id": "int", "descripcion": "string", "categoria": "category",
+            "subcategoria": "category", "precio_lista_cop": "float",
+        },
+        "unread": ["precio_lista_cop"],
+    },
+    "cartera": {
+        "columns": {
+            "documento_id": "string", "cliente_id": "int", "fecha_factura": "date",
+            "fecha_vencimiento": "date", "saldo_cop": "float", "dias_mora": "int",
+            "region": "category", "estado": "category",
+        },
+        "unread": ["estado"],
+    },
+    "inventario": {
+        "columns": {
+            "fecha_corte": "date", "producto_id": "int", "centro_logistico": "category",
+            "categoria": "category", "stock_unidades": "int", "valor_inventario_cop": "float",
+        },
+    },
+    "importaciones": {
+        # Exported from a Spanish-locale spreadsheet
+        "sep": ";",
+        "decimal": ",",
+        "columns": {
+            "importacion_id": "int", "proveedor": "category", "fecha_orden": "date",
+            "fecha_llegada": "date", "costo_mercancia_usd": "float", "flete_usd": "float",
+            "arancel_cop": "float", "otros_costos_cop": "float", "estado": "category",
+        },
+        "unread": ["importacion_id", "flete_usd", "arancel_cop", "otros_costos_cop", "estado"],
+    },
+}
+
+
+ARROW_TYPES = {
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "date": pa.timestamp("us"),  # same unit as pd.to_datetime
+    "category": pa.string(),  # dictionary-encoded when compacted
+    "string": pa.string(),
+}
+
+# Compaction role of each column type (see compact_frame)
+ROLES = {"category": "category", "int": "integer", "string": "string"}
+
+
+def table_columns(key):
+    """Declared {column: type} of a table (empty if it has no schema)."""
+    return TABLE_SCHEMAS.get(key, {}).get("columns", {})
+
+
+def read_columns(key):
+    """Declared columns of a table that something reads, in declared order."""
+    unread = set(TABLE_SCHEMAS.get(key, {}).get("unread", []))
+    return [col for col in table_columns(key) if col not in unread]
+
+
+def arrow_schema(key, columns=None):
+    """Arrow schema of a table's declared columns (or of those given)."""
+    declared = table_columns(key)
+    return pa.schema([(col, ARROW_TYPES[declared[col]]) for col in (columns or declared)])
+
+
+def date_columns(key):
+    """Date columns of a table according to its schema."""
+    return [col for col, kind in table_columns(key).items() if kind == "date"]
+
+
+def compaction_roles(key):
+    """{role: [columns]} of a table (category, integer, string), from its column types."""
+    roles = {role: [] for role in ROLES.values()}
+    for col, kind in table_columns(key).items():
+        if kind in ROLES:
+            roles[ROLES[kind]].append(col)
+    return roles
+
+
+def compact_frame(df, schema):
+    """
+    Returns a copy of df with the columns of each role (compaction_roles)
+    converted to compact dtypes. Columns missing from df, or that cannot be
+    converted safely (e.g. integers with nulls), are left untouched.
+    """
+    converted = {}
+    for col in schema.get("category", []):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            converted[col] = df[col].astype("category")
+    for col in schema.get("integer", []):
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            converted[col] = pd.to_numeric(df[col], downcast="integer")
+    for col in schema.get("string", []):
+        if col in df.columns and df[col].dtype != STRING_DTYPE:
+            converted[col] = df[col].astype(STRING_DTYPE)
+    return df.assign(**converted) if converted else df
+
+
+def memory_mb(df):
+    """Deep memory usage of a DataFrame in megabytes."""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def compact_data(data):
+    """
+    Compacts every table with a schema in TABLE_SCHEMAS.
+    Returns the new dictionary and a per-table memory report
+    (DataFrame with mb_before, mb_after and reduction factor).
+    """
+    compacted = dict(data)
+    rows = []
+    for key, df in data.items():
+        if key not in TABLE_SCHEMAS:
+            continue
+        before = memory_mb(df)
+        compacted[key] = compact_frame(df, compaction_roles(key))
+        after = memory_mb(compacted[key])
+        rows.append({
+            "tabla": key,
+            "filas": len(df),
+            "mb_before": before,
+            "mb_after": after,
+            "reduction": before / after if after else 1.0,
+        })
+    return compacted, pd.DataFrame(rows)
@@ -0,0 +1,130 @@
+import glob
+import hashlib
+import importlib
+import os
+
+import pandas as pd
+from data.snapshot import map_frame, write_frame
+
+# Configuration
+SHARED_ENABLED = os.environ.get("ANDINA_SHARED", "1") != "0"
+SHARED_PATH = os.environ.get(
+    "ANDINA_SHARED_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".shared")
+)
+KEEP_VERSIONS = 2  # per frame; older files are removed when a new one is written
+
+
+def _code_version():
+    # Frames are only reused by code that builds them the same way:
+    # changing any data module invalidates them
+    h = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+CODE_VERSION = _code_version()
+
+
+def shared_file(name, version):
+    """Path of the shared Arrow file of a frame at a data version."""
+    return os.path.join(SHARED_PATH, f"{name}-{CODE_VERSION}-{version}.arrow")
+
+
+def _prune(name, keep=KEEP_VERSIONS):
+    files = sorted(glob.glob(os.path.join(SHARED_PATH, f"{name}-*.arrow")), key=os.path.getmtime, reverse=True)
+    for path in files[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Still mapped on platforms that lock mapped files; next time
+            pass
+
+
+def shared_frame(name, version, build):
+    """
+    Cross-process memoization of a DataFrame per (name, data version).
+    version must identify the content of the inputs (data.loader.data_version
+    hashes every value), since files outlive the process: a version that
+    missed an edit would serve the old frame across restarts.
+    build() returns (value, meta). If another process (or an earlier run)
+    already wrote this version, it is memory-mapped zero-copy instead of
+    built; otherwise it is built, written once and mapped back, so every
+    worker on the host reads the same page-cache pages instead of holding
+    its own copy. Values that are not DataFrames are returned as built.
+    Returns (value, meta).
+    """
+    if not SHARED_ENABLED:
+        return build()
+    path = shared_file(name, version)
+    mapped = map_frame(path)
+    if mapped is not None:
+        return mapped
+
+    value, meta = build()
+    if not isinstance(value, pd.DataFrame) or not write_frame(path, value, meta):
+        return value, meta
+    _prune(name)
+    # Serve the mapped copy so this process does not keep a private one
+    return map_frame(path) or (value, meta)
+
+
+def _map_parts(name, version):
+    # (manifest, {part: mapped frame}) or None if any file is missing
+    mapped = map_frame(shared_file(name, version))
+    if mapped is None:
+        return None
+    manifest, frames = mapped[1], {}
+    for part in manifest.get("parts", []):
+        part_mapped = map_frame(shared_file(f"{name}.{part}", version))
+        if part_mapped is None:
+            return None
+        frames[part] = part_mapped[0]
+    return manifest, frames
+
+
+def _restore(manifest, frames, inputs):
+    if manifest.get("type") is None:
+        return frames["frame"]
+    module, qualname = manifest["type"].split(":")
+    cls = getattr(importlib.import_module(module), qualname)
+    return cls.from_frames(frames, manifest.get("meta", {}), *inputs)
+
+
+def shared_object(name, version, build, inputs=()):
+    """
+    shared_frame for the derived structures (SalesCube, SalesStar,
+    InventoryStore...). An object that defines to_frames() -> ({part:
+    DataFrame}, meta) and a from_frames(frames, meta, *inputs) classmethod
+    is written as one shared file per part, plus a manifest naming its
+    class; every worker then rebuilds it around the mapped parts instead of
+    holding its own arrays. inputs are what from_frames needs besides the
+    parts (e.g. the fact table the star positions point into).
+    DataFrames are shared as they are; other values are returned as built.
+    """
+    if not SHARED_ENABLED:
+        return build()
+    mapped = _map_parts(name, version)
+    if mapped is None:
+        value = build()
+        if isinstance(value, pd.DataFrame):
+            kind, (frames, meta) = None, ({"frame": value}, {})
+        elif hasattr(value, "to_frames"):
+            kind, (frames, meta) = f"{type(value).__module__}:{type(value).__qualname__}", value.to_frames()
+        else:
+            return value
+        # Parts first, manifest last: whoever finds the manifest finds the parts
+        manifest = {"type": kind, "parts": list(frames), "meta": meta}
+        if not all(write_frame(shared_file(f"{name}.{part}", version), frame) for part, frame in frames.items()) \
+                or not write_frame(shared_file(name, version), pd.DataFrame(), manifest):
+            return value
+        for part in frames:
+            _prune(f"{name}.{part}")
+        _prune(name)
+        # Serve the mapped copies so this process does not keep private ones
+        mapped = _map_parts(name, version)
+        if mapped is None:
+            return value
+    return _restore(*mapped, inputs)
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+
+import pyarrow as pa
+
+# Configuration
+SNAPSHOT_PATH = os.environ.get(
+    "ANDINA_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".snapshots")
+)
+SNAPSHOT_TTL = 600  # seconds, same as the Supabase query ttl
+
+META_KEY = b"andina"
+
+
+def snapshot_file(table_name):
+    """Returns the path of the on-disk snapshot for a table."""
+    return os.path.join(SNAPSHOT_PATH, f"{table_name}.arrow")
+
+
+def read_snapshot_meta(table_name):
+    """
+    Reads only the metadata of a snapshot (no column data).
+    Returns None if the snapshot does not exist or cannot be read.
+    """
+    path = snapshot_file(table_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, "r") as source:
+            schema = pa.ipc.open_file(source).schema
+        return json.loads(schema.metadata[META_KEY])
+    except Exception:
+        return None
+
+
+def is_fresh(meta, max_age=SNAPSHOT_TTL, source_path=None):
+    """
+    A snapshot is fresh when it is younger than max_age or, for CSV sources,
+    when the source file has not been modified since it was written.
+    """
+    if meta is None:
+        return False
+    if source_path is not None:
+        try:
+            return os.path.getmtime(source_path) <= meta["written_at"]
+        except OSError:
+            # Source file gone: the snapshot is the best copy we have
+            return True
+    return (time.time() - meta["written_at"]) <= max_age
+
+
+def _tmp_path(path):
+    # Unique per writer, so concurrent writes of one file never interleave
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def map_frame(path):
+    """
+    Memory-maps an Arrow IPC file as a DataFrame without copying: columns
+    stay backed by the file's pages (split_blocks keeps pandas from
+    consolidating them into new arrays), which the OS shares between all
+    processes mapping the same file. The arrays are read-only.
+    Returns (DataFrame, metadata dict) or None if missing/unreadable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        meta = json.loads((table.schema.metadata or {}).get(META_KEY, b"{}"))
+        return table.to_pandas(split_blocks=True), meta
+    except Exception:
+        return None
+
+
+def write_frame(path, df, meta=None):
+    """
+    Writes a DataFrame as an uncompressed Arrow IPC file (map_frame reads
+    it back zero-copy), with meta as JSON in the schema metadata.
+    The write is atomic (per-writer tmp file + rename). Returns True on
+    success.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            META_KEY: json.dumps(meta or {}, default=str).encode()
+        })
+        tmp_path = _tmp_path(path)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return True
+    except Exception:
+        return False
+
+
+def write_batches(path, schema, batches, meta=None):
+    """
+    Streams record batches into an Arrow IPC file (same format as
+    write_frame) without holding the whole table in memory.
+    The write is atomic: on failure the tmp file is removed, the previous
+    file is left as it was and the error is raised. Returns the rows written.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    schema = schema.with_metadata({
+        **(schema.metadata or {}),
+        META_KEY: json.dumps(meta or {}, default=str).encode()
+    })
+    tmp_path = _tmp_path(path)
+    rows = 0
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return rows
+
+
+def read_snapshot(table_name):
+    """
+    Memory-maps the snapshot of a table and returns it as a DataFrame.
+    Returns None if the snapshot does not exist or is unreadable.
+    """
+    mapped = map_frame(snapshot_file(table_name))
+    return mapped[0] if mapped is not None else None
+
+
+def write_snapshot(table_name, df, source, **meta):
+    """
+    Writes a DataFrame as an uncompressed Arrow IPC file so it can be
+    memory-mapped on the next start. The write is atomic (tmp file + rename).
+    Returns True on success; a failed snapshot never breaks loading.
+    """
+    info = {"source": source, "written_at": time.time(), "rows": len(df), **meta}
+    return write_frame(snapshot_file(table_name), df, info)
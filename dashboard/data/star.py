@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Dimension tables of the sales star: name -> foreign key in ventas.
+# Only the columns the fact table does not already carry are joined (its
+# own region/segmento/categoria... are the values at the time of sale).
+DIMENSIONS = {"productos": "producto_id", "clientes": "cliente_id"}
+
+
+def _take(series, positions):
+    # -1 (no match in the dimension) becomes a missing value, as in a left join
+    values = pd.api.extensions.take(series.array, positions, allow_fill=True)
+    return pd.Series(values, name=series.name)
+
+
+class SalesStar:
+    """
+    Sales fact table plus its dimension tables, joined lazily.
+    The fact rows are resolved to dimension row positions (int32) once per
+    data version; select() attaches only the dimension columns a caller
+    asks for, so the wide ventas x productos x clientes table is never
+    materialized. Duplicated dimension keys keep their last row.
+    Frames are shared: callers must not modify them.
+    """
+    def __init__(self, fact, dimensions, positions=None):
+        # positions: {dimension: fact row -> dimension row} from a previous
+        # build of the same data (see from_frames)
+        self.fact = fact
+        self._positions = {}
+        self._sources = {}  # column -> (dimension frame, fact row -> dimension row)
+        for name, (dim, key) in dimensions.items():
+            if key not in fact.columns or key not in dim.columns:
+                continue
+            if not dim[key].is_unique:
+                # A key exported twice (e.g. an edited product row appended
+                # to the master): the last row wins, one match per sale
+                dim = dim.drop_duplicates(key, keep="last")
+            if positions is not None and name in positions:
+                rows = positions[name]
+            else:
+                rows = pd.Index(dim[key]).get_indexer(fact[key]).astype(np.int32)
+            self._positions[name] = rows
+            for col in dim.columns:
+                if col not in fact.columns and col not in self._sources:
+                    self._sources[col] = (dim, rows)
+
+    def to_frames(self):
+        """
+        The position arrays as one shared-store part (see
+        data.shared_store.shared_object); the fact and dimension frames are
+        shared as the processed tables they are.
+        """
+        return {"positions": pd.DataFrame(self._positions)}, {}
+
+    @classmethod
+    def from_frames(cls, frames, meta, sales, products, customers):
+        positions = {name: frames["positions"][name].to_numpy() for name in frames["positions"].columns}
+        return build_sales_star(sales, products, customers, positions)
+
+    @property
+    def columns(self):
+        return pd.Index(list(self.fact.columns) + list(self._sources) + ["margen_pct"])
+
+    def __len__(self):
+        return len(self.fact)
+
+    def __contains__(self, col):
+        return col in self.columns
+
+    def column(self, col, rows=None):
+        """One column for every fact row (or the given row positions)."""
+        if col in self.fact.columns:
+            series = self.fact[col]
+            return series if rows is None else series.take(rows)
+        if col in self._sources:
+            dim, positions = self._sources[col]
+            series = _take(dim[col], positions if rows is None else positions[rows])
+            series.index = self.fact.index if rows is None else self.fact.index.take(rows)
+            return series
+        if col == "margen_pct":
+            margin = self.column("margen_total_cop", rows) / self.column("subtotal_cop", rows)
+            return margin.fillna(0).rename("margen_pct")
+        raise KeyError(col)
+
+    def __getitem__(self, col):
+        return self.column(col)
+
+    def select(self, columns=None, rows=None):
+        """
+        DataFrame of the given columns (default: every fact column) for
+        every fact row or only the given row positions. Dimension columns
+        are joined for those rows only.
+        """
+        columns = list(self.fact.columns) if columns is None else list(columns)
+        if all(col in self.fact.columns for col in columns):
+            frame = self.fact[columns]
+            return frame if rows is None else frame.take(rows)
+        return pd.concat([self.column(col, rows) for col in columns], axis=1)
+
+
+def build_sales_star(sales, products, customers, positions=None):
+    """
+    Sales star schema: the processed ventas as fact table, productos and
+    clientes as dimensions (see DIMENSIONS).
+    """
+    return SalesStar(sales, {"productos": (products, DIMENSIONS["productos"]),
+                             "clientes": (customers, DIMENSIONS["clientes"])}, positions)
@@ -0,0 +1,106 @@
+import time
+
+import pandas as pd
+
+from data.db import fetch_batches, fetch_frame, fetch_value, max_statement, projection, record_batches, select_statement
+from data.schema import arrow_schema
+from data.snapshot import read_snapshot, read_snapshot_meta, snapshot_file, write_batches, write_snapshot
+
+# Configuration
+INCREMENTAL_SYNC = True
+FULL_SYNC_INTERVAL = 24 * 3600  # seconds between full reloads of incremental tables
+
+# Append-mostly tables: rows newer than the high-water mark are fetched and
+# merged into the snapshot, deduplicated on the table key.
+# The mark is compared with '>=' so rows that arrive late for the last day
+# are picked up again; the dedup on the key makes that idempotent.
+# Updates to older rows (e.g. saldo_cop in cartera) are only seen on the
+# periodic full reload.
+SYNC_SPECS = {
+    "ventas": {"watermark": "fecha", "key": ["venta_id"]},
+    "inventario": {"watermark": "fecha_corte", "key": ["fecha_corte", "producto_id", "centro_logistico"]},
+    "cartera": {"watermark": "fecha_factura", "key": ["documento_id"]},
+}
+
+
+def high_water_mark(df, column):
+    """
+    Returns the max value of the watermark column as a JSON-friendly value,
+    keeping the column's own representation (ISO date string, int...).
+    """
+    if df.empty or column not in df.columns:
+        return None
+    mark = df[column].dropna().max()
+    if mark is None or pd.isna(mark):
+        return None
+    if isinstance(mark, pd.Timestamp) and mark == mark.normalize():
+        # Date columns come back as midnight timestamps; keep a date literal
+        return mark.date().isoformat()
+    if hasattr(mark, "isoformat"):
+        return mark.isoformat()
+    return mark.item() if hasattr(mark, "item") else mark
+
+
+def merge_increment(cached, increment, key):
+    """Appends the new rows to the cached frame, newest version of each key wins."""
+    if increment.empty:
+        return cached
+    merged = pd.concat([cached, increment], ignore_index=True)
+    return merged.drop_duplicates(subset=key, keep="last").reset_index(drop=True)
+
+
+def _full_sync(conn, key, table_name, columns, spec):
+    """
+    Streams the whole table (the projected columns) from a server-side
+    cursor straight into its snapshot and returns it memory-mapped.
+    """
+    meta = {"source": "supabase", "written_at": time.time(), "full_sync_at": time.time()}
+    if spec is not None:
+        # Taken before the scan: rows added meanwhile are fetched again by
+        # the next incremental sync ('>=' plus dedup on the key)
+        mark = fetch_value(conn, max_statement(table_name, spec["watermark"]))
+        meta["watermark"] = high_water_mark(pd.DataFrame({"mark": [mark]}), "mark")
+    schema = arrow_schema(key, columns)
+    batches = record_batches(fetch_batches(conn, select_statement(table_name, columns), key), schema)
+    write_batches(snapshot_file(table_name), schema, batches, meta)
+    df = read_snapshot(table_name)
+    if df is None:
+        raise RuntimeError(f"No se pudo leer la copia local de '{table_name}'")
+    return df
+
+
+def sync_table(conn, key, table_name):
+    """
+    Refreshes one table from Supabase and updates its snapshot.
+    Only the declared columns the dashboard reads are fetched (see
+    data.db), in server-side cursor batches.
+    Tables in SYNC_SPECS only fetch the rows at or after their high-water
+    mark, unless no usable snapshot exists or FULL_SYNC_INTERVAL has passed.
+    Returns the up-to-date DataFrame.
+    """
+    spec = SYNC_SPECS.get(key)
+    meta = read_snapshot_meta(table_name)
+
+    incremental = (
+        INCREMENTAL_SYNC
+        and spec is not None
+        and meta is not None
+        and meta.get("source") == "supabase"
+        and meta.get("watermark") is not None
+        and time.time() - meta.get("full_sync_at", 0) < FULL_SYNC_INTERVAL
+    )
+    columns = projection(conn, key, table_name)
+    cached = read_snapshot(table_name) if incremental else None
+    if cached is None or list(cached.columns) != list(columns):
+        return _full_sync(conn, key, table_name, columns, spec)
+
+    mark = meta["watermark"]
+    statement = select_statement(table_name, columns, since=spec["watermark"])
+    increment = fetch_frame(conn, statement, key, {"mark": mark})
+    df = merge_increment(cached, increment, spec["key"])
+    write_snapshot(
+        table_name, df, source="supabase",
+        watermark=high_water_mark(increment, spec["watermark"]) or mark,
+        full_sync_at=meta["full_sync_at"]
+    )
+    return df
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from data.aging import AGING_EDGES, aging_labels, bucket_aging, build_aging
+
+
+def test_labels_follow_edges():
+    assert aging_labels() == ["Al Día", "1-30 Días", "31-60 Días", "61-90 Días", "90+ Días"]
+
+
+def test_bucket_edges_are_inclusive_upper_bounds():
+    dias = pd.Series([-5, 0, 1, 30, 31, 60, 61, 90, 91, 400])
+    assert bucket_aging(dias).tolist() == [
+        "Al Día", "Al Día", "1-30 Días", "1-30 Días", "31-60 Días",
+        "31-60 Días", "61-90 Días", "61-90 Días", "90+ Días", "90+ Días",
+    ]
+
+
+def test_missing_days_past_due_get_no_bucket():
+    dias = pd.Series([np.nan, 45, None], dtype="float64")
+    buckets = bucket_aging(dias)
+    assert buckets.isna().tolist() == [True, False, True]
+    assert list(buckets.cat.categories) == aging_labels(AGING_EDGES)
+
+
+def test_summary_leaves_missing_days_out_of_every_bucket():
+    cartera = pd.DataFrame({
+        "documento_id": ["F1", "F2", "F3"],
+        "cliente_id": [1, 2, 3],
+        "region": ["Andina", "Caribe", "Andina"],
+        "saldo_cop": [100.0, 200.0, 400.0],
+        "dias_mora": pd.array([0, 91, None], dtype="Int64"),
+    })
+    aging = build_aging(cartera)
+    summary = aging.summary.set_index("aging_bucket")["saldo_cop"]
+    assert summary["Al Día"] == 100.0
+    assert summary["90+ Días"] == 200.0
+    assert summary.sum() == 300.0
+    assert aging.kpis["total_receivables"].iloc[0] == 700.0
+    assert aging.kpis["overdue_receivables"].iloc[0] == 200.0
+
+
+def test_per_client_totals_of_the_overdue_buckets():
+    cartera = pd.DataFrame({
+        "documento_id": ["F1", "F2", "F3", "F4"],
+        "cliente_id": [1, 1, 1, 2],
+        "region": ["Andina", "Andina", "Andina", "Caribe"],
+        "saldo_cop": [100.0, 200.0, 50.0, 400.0],
+        "dias_mora": [0, 45, 50, 120],
+    })
+    by_client = build_aging(cartera).by_client
+    assert by_client.astype({"aging_bucket": str}).to_dict("records") == [
+        {"cliente_id": 1, "aging_bucket": "31-60 Días", "saldo_cop": 250.0},
+        {"cliente_id": 2, "aging_bucket": "90+ Días", "saldo_cop": 400.0},
+    ]
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from data.cube import SalesCube, build_rollup
+
+
+def _sales():
+    return pd.DataFrame({
+        "mes": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-01-01", "2024-02-01", "2024-03-01"]),
+        "region": ["Andina", "Andina", "Caribe", "Andina", "Caribe"],
+        "producto_id": [1, 5, 2, 3, 4],
+        "cliente_id": [10, 10, 10, 10, 11],
+        "subtotal_cop": [100.0, 50.0, 200.0, 300.0, 400.0],
+    })
+
+
+def _cube():
+    df = _sales()
+    return SalesCube({
+        "producto": build_rollup(df, ["mes", "region", "producto_id"]),
+        "cliente": build_rollup(df, ["mes", "region", "cliente_id"]),
+    })
+
+
+def test_query_uses_smallest_covering_rollup():
+    cube = _cube()
+    assert len(cube.rollups["cliente"]) < len(cube.rollups["producto"])
+    assert len(cube._rollup_for(["mes"])) == len(cube.rollups["cliente"])
+    assert len(cube._rollup_for(["producto_id"])) == len(cube.rollups["producto"])
+
+
+def test_totals_match_row_level_sums():
+    cube = _cube()
+    assert cube.total("subtotal_cop") == 1050.0
+    by_region = cube.query("region", measures=["subtotal_cop"]).set_index("region")["subtotal_cop"]
+    assert by_region.to_dict() == {"Andina": 450.0, "Caribe": 600.0}
+
+
+def test_period_is_half_open():
+    cube = _cube()
+    total = cube.total("subtotal_cop", desde=pd.Timestamp("2024-01-01"), hasta=pd.Timestamp("2024-03-01"))
+    assert total == 650.0
+    assert cube.last_month() == pd.Timestamp("2024-03-01")
+
+
+def test_sales_cube_answers_totals_from_the_coarse_rollups():
+    from data.cube import build_sales_cube
+    from data.star import build_sales_star
+
+    sales = _sales().drop(columns="mes").assign(
+        fecha=pd.to_datetime(["2024-01-03", "2024-01-20", "2024-01-21", "2024-02-02", "2024-03-09"]),
+        ciudad=["Bogotá", "Bogotá", "Cartagena", "Medellín", "Cartagena"],
+        segmento="Retail",
+        categoria=["Alimentos", "Bebidas", "Alimentos", "Alimentos", "Bebidas"],
+        subcategoria=["Arroz", "Café", "Arroz", "Aceite", "Café"],
+    )
+    products = pd.DataFrame({"producto_id": [1, 2, 3, 4, 5], "descripcion": list("ABCDE")})
+    customers = pd.DataFrame({"cliente_id": [10, 11], "nombre_cliente": ["Ana", "Luis"]})
+    cube = build_sales_cube(build_sales_star(sales, products, customers))
+    assert cube._rollup_for(["mes", "region"]) is cube.rollups["geografia"]
+    assert cube._rollup_for(["subcategoria"]) is cube.rollups["categoria"]
+    assert cube.total("subtotal_cop") == sales["subtotal_cop"].sum()
+    by_month = cube.query("mes", measures=["subtotal_cop"], sort="mes", ascending=True)
+    assert by_month["subtotal_cop"].tolist() == [350.0, 300.0, 400.0]
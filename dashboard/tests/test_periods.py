@@ -0,0 +1,70 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.periods import DEFAULT_PERIOD, date_bounds, period_label, preset_periods, resolve_period
+
+T = pd.Timestamp
+
+
+def test_whole_history_is_unbounded():
+    assert resolve_period(DEFAULT_PERIOD, T("2024-11-15")) == (None, None)
+    assert resolve_period(None, T("2024-11-15")) == (None, None)
+
+
+def test_preset_counts_whole_months_back_from_latest():
+    desde, hasta = resolve_period("Último trimestre", T("2024-11-15"))
+    assert (desde, hasta) == (T("2024-09-01"), T("2024-12-01"))
+    # The latest month is included whatever day it ends on
+    assert resolve_period("Último trimestre", T("2024-11-30 23:59")) == (desde, hasta)
+    assert resolve_period("Último año", T("2024-02-29")) == (T("2023-03-01"), T("2024-03-01"))
+
+
+def test_preset_without_data_is_unbounded():
+    assert resolve_period("Último año", None) == (None, None)
+    assert resolve_period("Último año", pd.NaT) == (None, None)
+
+
+def test_custom_range_widens_to_whole_months():
+    choice = (datetime.date(2023, 2, 10), datetime.date(2023, 4, 3))
+    assert resolve_period(choice, None) == (T("2023-02-01"), T("2023-05-01"))
+    # A single date picked so far (range still being edited) is unbounded
+    assert resolve_period((datetime.date(2023, 2, 10),), None) == (None, None)
+
+
+def test_presets_for_precompute():
+    assert preset_periods(T("2024-11-15")) == [
+        (T("2024-09-01"), T("2024-12-01")),
+        (T("2024-06-01"), T("2024-12-01")),
+        (T("2023-12-01"), T("2024-12-01")),
+    ]
+
+
+def test_label_shows_last_included_month():
+    assert period_label(T("2024-09-01"), T("2024-12-01")) == "sep 2024 – nov 2024"
+    assert period_label(None, None) is None
+
+
+def test_date_bounds_are_half_open():
+    dates = pd.to_datetime([
+        "2024-01-31 23:59", "2024-02-01 00:00", "2024-02-15 00:00", "2024-02-29 23:59", "2024-03-01 00:00",
+    ]).to_numpy()
+    lo, hi = date_bounds(dates, T("2024-02-01"), T("2024-03-01"))
+    assert (lo, hi) == (1, 4)
+    assert date_bounds(dates) == (0, 5)
+    assert date_bounds(dates, desde=T("2024-03-01")) == (4, 5)
+    assert date_bounds(dates, hasta=T("2024-02-01")) == (0, 1)
+
+
+def test_date_bounds_of_an_empty_or_inverted_period():
+    dates = pd.to_datetime(["2024-01-15", "2024-02-15"]).to_numpy()
+    assert date_bounds(dates, T("2025-01-01"), T("2025-02-01")) == (2, 2)
+    lo, hi = date_bounds(dates, T("2024-03-01"), T("2024-01-01"))
+    assert lo == hi
+
+
+def test_date_bounds_exclude_missing_dates_from_bounded_periods():
+    dates = np.array(["2024-01-15", "2024-02-15", "NaT"], dtype="datetime64[us]")
+    assert date_bounds(dates, hasta=T("2024-03-01")) == (0, 2)
+    assert date_bounds(dates, desde=T("2024-02-01"), hasta=T("2030-01-01")) == (1, 2)
@@ -0,0 +1,48 @@
+import pandas as pd
+
+from data.star import build_sales_star
+
+
+def _tables():
+    sales = pd.DataFrame({
+        "venta_id": [1, 2, 3],
+        "producto_id": [10, 20, 30],
+        "cliente_id": [100, 100, 200],
+        "subtotal_cop": [1000.0, 2000.0, 500.0],
+        "margen_total_cop": [100.0, 500.0, 0.0],
+    })
+    products = pd.DataFrame({"producto_id": [10, 20], "descripcion": ["Arroz", "Café"]})
+    customers = pd.DataFrame({"cliente_id": [100, 200], "nombre_cliente": ["Ana", "Luis"]})
+    return sales, products, customers
+
+
+def test_dimension_columns_are_joined_like_a_left_join():
+    star = build_sales_star(*_tables())
+    assert star["descripcion"].tolist()[:2] == ["Arroz", "Café"]
+    assert pd.isna(star["descripcion"].iloc[2])
+    assert star.select(["venta_id", "nombre_cliente"], rows=[2])["nombre_cliente"].tolist() == ["Luis"]
+
+
+def test_duplicated_dimension_key_keeps_last_row():
+    sales, products, customers = _tables()
+    products = pd.concat([products, pd.DataFrame({"producto_id": [10], "descripcion": ["Arroz 5kg"]})], ignore_index=True)
+    star = build_sales_star(sales, products, customers)
+    assert len(star) == len(sales)
+    assert star["descripcion"].tolist()[:2] == ["Arroz 5kg", "Café"]
+
+
+def test_margin_pct_is_computed_on_demand():
+    star = build_sales_star(*_tables())
+    assert star["margen_pct"].tolist() == [0.1, 0.25, 0.0]
+
+
+def test_shared_star_wraps_the_mapped_positions(tmp_path, monkeypatch):
+    from data import shared_store
+    monkeypatch.setattr(shared_store, "SHARED_PATH", str(tmp_path))
+    monkeypatch.setattr(shared_store, "SHARED_ENABLED", True)
+    sales, products, customers = _tables()
+    built = shared_store.shared_object("ventas_star", "v1", lambda: build_sales_star(sales, products, customers),
+                                       (sales, products, customers))
+    mapped = shared_store.shared_object("ventas_star", "v1", lambda: None, (sales, products, customers))
+    assert mapped["nombre_cliente"].tolist() == built["nombre_cliente"].tolist() == ["Ana", "Ana", "Luis"]
+    assert pd.isna(mapped["descripcion"].iloc[2])
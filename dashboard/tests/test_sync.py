@@ -0,0 +1,55 @@
+import pandas as pd
+
+from data.sync import high_water_mark, merge_increment
+
+
+def test_increment_replaces_rows_with_the_same_key():
+    cached = pd.DataFrame({"documento_id": ["F1", "F2"], "saldo_cop": [100.0, 200.0]})
+    increment = pd.DataFrame({"documento_id": ["F2", "F3"], "saldo_cop": [150.0, 300.0]})
+    merged = merge_increment(cached, increment, ["documento_id"])
+    assert merged["documento_id"].tolist() == ["F1", "F2", "F3"]
+    assert merged["saldo_cop"].tolist() == [100.0, 150.0, 300.0]
+    assert merged.index.tolist() == [0, 1, 2]
+
+
+def test_last_row_wins_within_the_increment():
+    cached = pd.DataFrame({"venta_id": [1], "cantidad": [1]})
+    increment = pd.DataFrame({"venta_id": [2, 2], "cantidad": [5, 7]})
+    merged = merge_increment(cached, increment, ["venta_id"])
+    assert merged.set_index("venta_id")["cantidad"].to_dict() == {1: 1, 2: 7}
+
+
+def test_composite_key():
+    key = ["fecha_corte", "producto_id", "centro_logistico"]
+    cached = pd.DataFrame({
+        "fecha_corte": pd.to_datetime(["2024-06-30", "2024-06-30"]),
+        "producto_id": [1, 1],
+        "centro_logistico": ["Bogotá", "Cali"],
+        "stock_unidades": [10, 20],
+    })
+    increment = cached.iloc[[1]].assign(stock_unidades=25)
+    merged = merge_increment(cached, increment, key)
+    assert merged["stock_unidades"].tolist() == [10, 25]
+
+
+def test_empty_increment_returns_the_cached_frame():
+    cached = pd.DataFrame({"venta_id": [1, 2]})
+    assert merge_increment(cached, cached.iloc[0:0], ["venta_id"]) is cached
+
+
+def test_high_water_mark_keeps_date_literals():
+    df = pd.DataFrame({"fecha": pd.to_datetime(["2024-01-31", "2024-02-29", None])})
+    assert high_water_mark(df, "fecha") == "2024-02-29"
+    assert high_water_mark(df.iloc[0:0], "fecha") is None
+
+
+def test_version_statement_counts_rows_and_reads_the_watermark(tmp_path):
+    import sqlalchemy as sa
+    from data.db import fetch_row, version_statement
+
+    class Conn:
+        engine = sa.create_engine(f"sqlite:///{tmp_path / 'andina.db'}")
+
+    pd.DataFrame({"venta_id": [1, 2], "fecha": ["2024-01-31", "2024-02-29"]}).to_sql("ventas_andina", Conn.engine, index=False)
+    assert fetch_row(Conn, version_statement("ventas_andina", "fecha")) == (2, "2024-02-29")
+    assert fetch_row(Conn, version_statement("ventas_andina")) == (2, None)
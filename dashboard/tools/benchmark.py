@@ -0,0 +1,145 @@
+"""
+Headless benchmark of the dashboard pipeline.
+
+Times each stage and reports its peak memory, without a browser:
+load_data (cold from the CSVs, then from the Arrow snapshots),
+compact_data, process_data and every view (run through Streamlit's
+AppTest with the data already loaded, so only the view's own computations
+and figures are measured).
+
+    python -m tools.benchmark --rows 1000000           # synthetic data
+    python -m tools.benchmark --data /path/to/exports   # existing CSVs
+
+Peak memory is measured with tracemalloc (Python, NumPy and pandas
+allocations); arrow_mb is the Arrow memory pool in use after the stage.
+Run it before and after a change with the same --rows and --seed.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import pyarrow as pa
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(results, stage, fn):
+    """Runs fn() as one stage and appends its time and peak memory."""
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    error = None
+    try:
+        value = fn()
+    except Exception as e:
+        value, error = None, f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] - base
+    results.append({
+        "stage": stage,
+        "seconds": round(seconds, 3),
+        "peak_mb": round(peak / 1e6, 1),
+        "arrow_mb": round(pa.total_allocated_bytes() / 1e6, 1),
+        "error": error,
+    })
+    return value
+
+
+def run_views(results, timeout):
+    """Times every page of app.py with its data already loaded."""
+    from streamlit.testing.v1 import AppTest
+    from components.sidebar import NAVIGATION_OPTIONS
+    from utils.figure_cache import get_figure_cache
+    from utils.insights import _cached_insights
+
+    app = AppTest.from_file(os.path.join(DASHBOARD_DIR, "app.py"), default_timeout=timeout)
+    app.run()
+    for page in NAVIGATION_OPTIONS:
+        # Warm run loads and processes the page's datasets ...
+        app.sidebar.radio[0].set_value(page)
+        app.run()
+        # ... the timed one only recomputes aggregates, insights and figures
+        get_figure_cache.clear()
+        _cached_insights.clear()
+
+        def render():
+            app.run()
+            if app.exception:
+                raise RuntimeError(app.exception[0].value)
+        measure(results, f"view: {page}", render)
+
+
+def run(timeout=600):
+    """
+    Runs every stage against ANDINA_DATA_PATH; returns the results.
+    ANDINA_SNAPSHOT_PATH must point to an empty directory so the first
+    load really reads the CSVs.
+    """
+    from streamlit.logger import set_log_level
+    set_log_level("error")  # bare-mode warnings
+    from data import loader
+    from data.schema import compact_data
+    from data.processor import process_data
+
+    results = []
+    tracemalloc.start()
+    try:
+        loader.get_table_store().clear()
+        raw = measure(results, "load_data (csv)", loader.load_data)
+        loader.get_table_store().clear()
+        raw = measure(results, "load_data (snapshot)", loader.load_data)
+        compacted, _ = measure(results, "compact_data", lambda: compact_data(raw))
+        measure(results, "process_data", lambda: process_data(compacted))
+        del raw, compacted
+        run_views(results, timeout)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sin navegador del tablero.")
+    parser.add_argument("--data", help="directorio con los CSV (por defecto se generan)")
+    parser.add_argument("--rows", type=int, default=100_000, help="filas de ventas a generar")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=int, default=600, help="segundos máximos por vista")
+    parser.add_argument("--json", help="guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    # Configuration is read when the dashboard modules are imported
+    data_path = args.data or tempfile.mkdtemp(prefix="andina_data_")
+    snapshots = tempfile.mkdtemp(prefix="andina_snapshots_")
+    # Shared frames and materialized results go to temp directories too, so
+    # a run neither reuses nor leaves behind files the dashboard would serve
+    shared = tempfile.mkdtemp(prefix="andina_shared_")
+    materialized = tempfile.mkdtemp(prefix="andina_materialized_")
+    os.environ["ANDINA_DATA_PATH"] = data_path
+    os.environ["ANDINA_SNAPSHOT_PATH"] = snapshots
+    os.environ["ANDINA_SHARED_PATH"] = shared
+    os.environ["ANDINA_MATERIALIZED_PATH"] = materialized
+    os.environ["ANDINA_REFRESH_INTERVAL"] = "0"
+    try:
+        if args.data is None:
+            from tools.generate_data import generate
+            generate(data_path, args.rows, seed=args.seed)
+        results = run(timeout=args.timeout)
+    finally:
+        for path in (snapshots, shared, materialized):
+            shutil.rmtree(path, ignore_errors=True)
+        if args.data is None:
+            shutil.rmtree(data_path, ignore_errors=True)
+
+    import pandas as pd
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"data": args.data, "rows": None if args.data else args.rows,
+                       "seed": args.seed, "stages": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Deterministic synthetic Comercializadora Andina data.
+
+Writes the six tables the dashboard reads (same file names and columns
+as the Supabase exports, importaciones with ';' separator and decimal
+comma) at a configurable scale, so loading, processing and the views can
+be measured without the real data:
+
+    python -m tools.generate_data --rows 1000000 --out /tmp/andina
+
+and then run the app or the benchmark with ANDINA_DATA_PATH=/tmp/andina.
+The same --rows and --seed always produce the same files. Sales are
+written in chunks of CHUNK_ROWS, so 100M rows fit in memory.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.loader import FILES
+
+CHUNK_ROWS = 1_000_000
+START_DATE = pd.Timestamp("2023-01-01")
+SALES_DAYS = 730
+INVENTORY_CUTOFFS = 52  # weekly
+
+REGIONS = {
+    "Andina": ["Bogotá", "Medellín", "Bucaramanga", "Manizales", "Pereira"],
+    "Caribe": ["Barranquilla", "Cartagena", "Santa Marta", "Montería"],
+    "Pacífica": ["Cali", "Pasto", "Buenaventura"],
+    "Orinoquía": ["Villavicencio", "Yopal"],
+    "Amazonía": ["Florencia", "Leticia"],
+}
+SEGMENTS = ["Retail", "Mayorista", "Corporativo", "Institucional"]
+CATEGORIES = {
+    "Alimentos": ["Granos", "Lácteos", "Enlatados", "Snacks"],
+    "Bebidas": ["Gaseosas", "Jugos", "Agua"],
+    "Aseo": ["Hogar", "Personal"],
+    "Cuidado Personal": ["Cabello", "Piel"],
+}
+CENTERS = ["CEDI Bogotá", "CEDI Medellín", "CEDI Barranquilla", "CEDI Cali"]
+SUPPLIERS = [f"Proveedor {name}" for name in ["Asia", "Andes", "Norte", "Sur", "Pacífico", "Atlántico", "Europa", "Cono"]]
+
+
+def table_sizes(rows):
+    """Rows per table for a given number of sales rows."""
+    return {
+        "ventas": rows,
+        "clientes": int(np.clip(rows // 100, 500, 500_000)),
+        "productos": int(np.clip(rows // 1000, 200, 50_000)),
+        "cartera": int(np.clip(rows // 20, 1_000, 5_000_000)),
+        "importaciones": int(np.clip(rows // 1000, 300, 100_000)),
+    }
+
+
+def _path(out, key):
+    return os.path.join(out, FILES[key])
+
+
+def make_clientes(rng, n):
+    cities = [(region, city) for region, cs in REGIONS.items() for city in cs]
+    city = rng.integers(0, len(cities), n)
+    ids = np.arange(1, n + 1)
+    return pd.DataFrame({
+        "cliente_id": ids,
+        "nombre_cliente": [f"Cliente {i:06d}" for i in ids],
+        "region": [cities[i][0] for i in city],
+        "ciudad": [cities[i][1] for i in city],
+        "segmento": rng.choice(SEGMENTS, n, p=[0.5, 0.3, 0.15, 0.05]),
+        "estado": rng.choice(["Activo", "Inactivo"], n, p=[0.85, 0.15]),
+        "fecha_alta": (pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3000, n), "D")).strftime("%Y-%m-%d"),
+    })
+
+
+def make_productos(rng, n):
+    subcategories = [(cat, sub) for cat, subs in CATEGORIES.items() for sub in subs]
+    sub = rng.integers(0, len(subcategories), n)
+    ids = np.arange(1, n + 1)
+    return pd.DataFrame({
+        "producto_id": ids,
+        "descripcion": [f"Producto {i:05d}" for i in ids],
+        "categoria": [subcategories[i][0] for i in sub],
+        "subcategoria": [subcategories[i][1] for i in sub],
+        # Log-normal list prices between a few thousand and ~1M COP
+        "precio_lista_cop": np.round(np.exp(rng.normal(10.5, 1.0, n)), -2).clip(1_000, 1_000_000),
+    })
+
+
+def make_ventas_chunk(rng, start, n, total, clientes, productos):
+    """Rows start..start+n of the sales table, ordered by date."""
+    ids = np.arange(start + 1, start + n + 1)
+    # Dates grow with venta_id, like an append-only transactional table
+    days = (ids - 1) * SALES_DAYS // total
+    client = rng.integers(0, len(clientes), n)
+    product = rng.integers(0, len(productos), n)
+    cantidad = rng.integers(1, 60, n)
+    precio = (productos["precio_lista_cop"].to_numpy()[product] * rng.uniform(0.85, 1.05, n)).round(0)
+    subtotal = cantidad * precio
+    return pd.DataFrame({
+        "venta_id": ids,
+        "fecha": (START_DATE + pd.to_timedelta(days, "D")).strftime("%Y-%m-%d"),
+        "cliente_id": clientes["cliente_id"].to_numpy()[client],
+        "producto_id": productos["producto_id"].to_numpy()[product],
+        "region": clientes["region"].to_numpy()[client],
+        "ciudad": clientes["ciudad"].to_numpy()[client],
+        "segmento": clientes["segmento"].to_numpy()[client],
+        "categoria": productos["categoria"].to_numpy()[product],
+        "subcategoria": productos["subcategoria"].to_numpy()[product],
+        "cantidad": cantidad,
+        "precio_unitario_cop": precio,
+        "subtotal_cop": subtotal,
+        "margen_total_cop": (subtotal * rng.normal(0.18, 0.1, n)).round(0),
+    })
+
+
+def make_cartera(rng, n, clientes):
+    client = rng.integers(0, len(clientes), n)
+    issued = START_DATE + pd.to_timedelta(np.sort(rng.integers(0, SALES_DAYS, n)), "D")
+    due = issued + pd.to_timedelta(rng.choice([30, 60, 90], n), "D")
+    as_of = START_DATE + pd.Timedelta(days=SALES_DAYS)
+    # Old invoices are mostly settled, so mora is capped at a random age
+    dias_mora = np.minimum((as_of - due).days.to_numpy(), rng.integers(-30, 180, n))
+    saldo = np.round(np.exp(rng.normal(15, 1.2, n)), -3)
+    return pd.DataFrame({
+        "documento_id": [f"FV-{i:08d}" for i in range(1, n + 1)],
+        "cliente_id": clientes["cliente_id"].to_numpy()[client],
+        "region": clientes["region"].to_numpy()[client],
+        "fecha_factura": issued.strftime("%Y-%m-%d"),
+        "fecha_vencimiento": due.strftime("%Y-%m-%d"),
+        "saldo_cop": saldo,
+        "dias_mora": dias_mora,
+        "estado": np.where(dias_mora > 0, "Vencida", "Vigente"),
+    })
+
+
+def make_inventario_cutoff(rng, cutoff, productos):
+    n = len(productos) * len(CENTERS)
+    product = np.repeat(np.arange(len(productos)), len(CENTERS))
+    stock = rng.integers(0, 2_000, n)
+    return pd.DataFrame({
+        "fecha_corte": cutoff.strftime("%Y-%m-%d"),
+        "producto_id": productos["producto_id"].to_numpy()[product],
+        "centro_logistico": np.tile(CENTERS, len(productos)),
+        "categoria": productos["categoria"].to_numpy()[product],
+        "stock_unidades": stock,
+        "valor_inventario_cop": stock * (productos["precio_lista_cop"].to_numpy()[product] * 0.7).round(0),
+    })
+
+
+def make_importaciones(rng, n):
+    ordered = START_DATE + pd.to_timedelta(np.sort(rng.integers(0, SALES_DAYS, n)), "D")
+    arrived = ordered + pd.to_timedelta(rng.integers(15, 120, n), "D")
+    merchandise = np.round(np.exp(rng.normal(10, 1, n)), 2)
+    return pd.DataFrame({
+        "importacion_id": np.arange(1, n + 1),
+        "proveedor": rng.choice(SUPPLIERS, n),
+        "fecha_orden": ordered.strftime("%Y-%m-%d"),
+        "fecha_llegada": arrived.strftime("%Y-%m-%d"),
+        "costo_mercancia_usd": merchandise,
+        "flete_usd": np.round(merchandise * rng.uniform(0.05, 0.2, n), 2),
+        "arancel_cop": np.round(merchandise * 4_000 * rng.uniform(0.05, 0.15, n), 2),
+        "otros_costos_cop": np.round(rng.uniform(2e5, 5e6, n), 2),
+        "estado": rng.choice(["En tránsito", "Nacionalizada", "Recibida"], n, p=[0.1, 0.2, 0.7]),
+    })
+
+
+def generate(out, rows, seed=42, log=print):
+    """
+    Writes the six CSVs for `rows` sales rows into `out`.
+    Every table (and every sales chunk) draws from its own generator seeded
+    from (seed, stream), so the output only depends on rows and seed.
+    """
+    os.makedirs(out, exist_ok=True)
+    sizes = table_sizes(rows)
+
+    def rng(*stream):
+        return np.random.default_rng([seed, *stream])
+
+    started = time.perf_counter()
+    clientes = make_clientes(rng(1), sizes["clientes"])
+    clientes.to_csv(_path(out, "clientes"), index=False)
+    productos = make_productos(rng(2), sizes["productos"])
+    productos.to_csv(_path(out, "productos"), index=False)
+
+    for chunk, start in enumerate(range(0, rows, CHUNK_ROWS)):
+        n = min(CHUNK_ROWS, rows - start)
+        df = make_ventas_chunk(rng(3, chunk), start, n, rows, clientes, productos)
+        df.to_csv(_path(out, "ventas"), index=False, mode="w" if chunk == 0 else "a", header=chunk == 0)
+        log(f"ventas: {start + n:,}/{rows:,}")
+
+    make_cartera(rng(4), sizes["cartera"], clientes).to_csv(_path(out, "cartera"), index=False)
+
+    cutoffs = pd.date_range(START_DATE + pd.Timedelta(days=SALES_DAYS), periods=INVENTORY_CUTOFFS, freq="-1W")[::-1]
+    for i, cutoff in enumerate(cutoffs):
+        df = make_inventario_cutoff(rng(5, i), cutoff, productos)
+        df.to_csv(_path(out, "inventario"), index=False, mode="w" if i == 0 else "a", header=i == 0)
+
+    # Exported from a Spanish-locale spreadsheet: ';' and decimal comma
+    make_importaciones(rng(6), sizes["importaciones"]).to_csv(_path(out, "importaciones"), index=False, sep=";", decimal=",")
+
+    sizes["inventario"] = INVENTORY_CUTOFFS * sizes["productos"] * len(CENTERS)
+    log(f"Listo en {time.perf_counter() - started:.1f}s: " + ", ".join(f"{k}={v:,}" for k, v in sizes.items()))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos de Comercializadora Andina.")
+    parser.add_argument("--rows", type=int, default=100_000, help="filas de ventas (10k a 100M)")
+    parser.add_argument("--out", default="synthetic_data", help="directorio de salida")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.out, args.rows, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
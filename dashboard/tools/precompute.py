@@ -0,0 +1,56 @@
+"""
+Precomputes every page's results into the materialized store.
+
+Run it after each data load (e.g. nightly, right after the export):
+
+    python -m tools.precompute                 # every view
+    python -m tools.precompute --views overview,customers
+
+Each view's compute() is run for every filter value it lists in
+precompute_filters() (just the defaults if it has none) and the results
+are written to data.materialized.MATERIALIZED_PATH, tagged with the data
+version. The dashboard serves them directly while that version is loaded;
+once the data changes it computes on demand again until the next run.
+"""
+import argparse
+import time
+
+from streamlit.logger import set_log_level
+
+set_log_level("error")  # bare-mode warnings, before the dashboard modules log them
+from data.materialized import filters_key, write_results
+from data.processor import load_datasets
+from views import overview, profitability, customers, imports, inventory, credit_risk
+
+VIEWS = [overview, profitability, customers, imports, inventory, credit_risk]
+
+
+def view_name(view):
+    return view.__name__.rsplit(".", 1)[-1]
+
+
+def precompute(view, log=print):
+    """Computes and stores every precomputable result of one view."""
+    started = time.perf_counter()
+    data = load_datasets(view.REQUIRES)
+    options = view.precompute_filters(data) if hasattr(view, "precompute_filters") else [{}]
+    results = {filters_key(filters): view.compute(data, **filters) for filters in options}
+    if not write_results(view_name(view), data.version, results):
+        raise RuntimeError(f"No se pudo escribir el almacén de '{view_name(view)}'")
+    log(f"{view_name(view)}: {len(results)} combinaciones en {time.perf_counter() - started:.1f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcula los resultados de cada vista.")
+    parser.add_argument("--views", help="vistas separadas por coma (por defecto todas)")
+    args = parser.parse_args()
+
+    selected = set(args.views.split(",")) if args.views else None
+    for view in VIEWS:
+        if selected is None or view_name(view) in selected:
+            precompute(view)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Up to this many rows the scatter draws every transaction (WebGL);
+# above it, transactions are aggregated server-side into a 2D grid.
+SCATTER_POINT_LIMIT = 5000
+DENSITY_BINS = 80
+
+
+def bin_2d(df, x, y, color, bins=DENSITY_BINS):
+    """
+    Aggregates rows into a bins x bins grid per color category.
+    Returns one row per non-empty cell with the cell center, the category
+    and the number of rows ('transacciones') it holds. Every row with finite
+    x/y is counted, so outliers still appear as (small) cells.
+    """
+    xs = df[x].to_numpy(dtype=float)
+    ys = df[y].to_numpy(dtype=float)
+    finite = np.isfinite(xs) & np.isfinite(ys)
+    xs, ys = xs[finite], ys[finite]
+    colors = pd.Categorical(df[color])[finite]
+
+    if len(xs) == 0:
+        return pd.DataFrame(columns=[x, y, color, "transacciones"])
+
+    def cell(values):
+        low, high = values.min(), values.max()
+        width = (high - low) / bins or 1.0
+        index = np.minimum(((values - low) / width).astype(np.int64), bins - 1)
+        return index, low + (np.arange(bins) + 0.5) * width
+
+    ix, x_centers = cell(xs)
+    iy, y_centers = cell(ys)
+    codes = colors.codes.astype(np.int64)
+    categories = list(colors.categories)
+    if (codes < 0).any():
+        # Rows without category get their own
+        codes[codes < 0] = len(categories)
+        categories.append("Sin dato")
+    keys = (codes * bins + ix) * bins + iy
+
+    cells, counts = np.unique(keys, return_counts=True)
+    cell_code, rest = np.divmod(cells, bins * bins)
+    cell_x, cell_y = np.divmod(rest, bins)
+
+    return pd.DataFrame({
+        x: x_centers[cell_x],
+        y: y_centers[cell_y],
+        color: pd.Categorical.from_codes(cell_code, categories=categories),
+        "transacciones": counts,
+    })
+
+
+def density_frame(df, x, y, color, point_limit=SCATTER_POINT_LIMIT, bins=DENSITY_BINS):
+    """
+    What the scatter draws: the rows themselves when there are at most
+    point_limit (drawn with WebGL), else their bin_2d cells with a 'peso'
+    size column, so the browser payload is bounded without sampling.
+    Returns (frame, binned).
+    """
+    if len(df) <= point_limit:
+        return df, False
+    cells = bin_2d(df, x, y, color, bins=bins)
+    return cells.assign(peso=np.log1p(cells["transacciones"])), True
+
+
+def density_figure(frame, binned, x, y, color, labels=None, hover_data=None, template="plotly_white"):
+    """Figure for a density_frame result."""
+    labels = labels or {}
+    if not binned:
+        return px.scatter(
+            frame, x=x, y=y, color=color,
+            hover_data=hover_data,
+            labels=labels,
+            template=template,
+            render_mode="webgl"
+        )
+    return px.scatter(
+        frame, x=x, y=y, color=color,
+        size="peso",
+        size_max=14,
+        hover_data={"transacciones": True, "peso": False},
+        labels={**labels, "transacciones": "Transacciones"},
+        template=template
+    )
+
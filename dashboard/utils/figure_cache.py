@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+from utils.metrics import timed, note_miss
+
+# Max figures/aggregates kept; least recently used are evicted first
+FIGURE_CACHE_SIZE = 256
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used cache."""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """Process-wide cache shared by all sessions."""
+    return LRUCache(FIGURE_CACHE_SIZE)
+
+
+def cached(view, item_id, data, build, filters=None):
+    """
+    Returns build() memoized on (view, item id, data version, filter values).
+    Used for Plotly figures and for the aggregates behind them, so an
+    unchanged chart costs a dictionary lookup instead of a groupby plus a
+    new figure. filters must hold every widget value build() depends on.
+    Data without a version (plain dicts) is never cached.
+    Cached objects are shared: callers must not modify them.
+    """
+    version = getattr(data, "version", None)
+    if version is None:
+        return build()
+
+    key = (view, item_id, version, tuple(sorted((filters or {}).items())))
+    cache = get_figure_cache()
+    with timed("view", f"{view}.{item_id}", cached=True) as record:
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            note_miss()
+            value = build()
+            cache.put(key, value)
+        record.rows = len(value) if isinstance(value, pd.DataFrame) else None
+    return value
@@ -1,5 +1,6 @@
 import pandas as pd
 import streamlit as st
+from utils.metrics import timed, note_miss
 
 def display_insight_box(title, content):
     """
@@ -30,12 +31,16 @@ def analyze_trend(df, date_col, value_col, period="M"):
     if df.empty:
         return "No hay datos suficientes para analizar la tendencia."
         
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
+    dates = df[date_col]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
     
     # Group by period
-    trend = df.groupby(df[date_col].dt.to_period(period))[value_col].sum().sort_index()
-    
+    trend = df.groupby(dates.dt.to_period(period))[value_col].sum().sort_index()
+    return _trend_text(trend)
+
+def _trend_text(trend):
+    """Trend message from a period-sorted series of totals."""
     if len(trend) < 2:
         return "Se necesitan al menos dos periodos para calcular una tendencia."
         
@@ -58,7 +63,14 @@ def analyze_distribution(df, category_col, value_col, top_n=1):
     if df.empty:
         return "No hay datos."
         
-    dist = df.groupby(category_col)[value_col].sum().sort_values(ascending=False)
+    dist = df.groupby(category_col, observed=True)[value_col].sum().sort_values(ascending=False)
+    return _distribution_text(dist)
+
+def _distribution_text(dist):
+    """Top-category message from a descending series of totals."""
+    if dist.empty:
+        return "No hay datos."
+        
     total = dist.sum()
     
     if total == 0:
@@ -77,9 +89,80 @@ def analyze_performance(df, entity_col, value_col, label="Rentabilidad"):
     if df.empty:
         return "No hay datos."
         
-    perf = df.groupby(entity_col)[value_col].sum().sort_values(ascending=False)
-    
+    perf = df.groupby(entity_col, observed=True)[value_col].sum().sort_values(ascending=False)
+    return _performance_text(perf, label)
+
+def _performance_text(perf, label):
+    """Leader/laggard message from a descending series of totals."""
+    if perf.empty:
+        return "No hay datos."
+        
     top = perf.index[0]
     bottom = perf.index[-1]
     
     return f"🏆 **{label}:** Líder: **'{top}'** | Menor: **'{bottom}'**."
+
+def _compute_insights(df, specs):
+    # One groupby per distinct (column, period) shared by all the specs on it
+    groups = {}
+    for spec in specs:
+        values = groups.setdefault((spec["by"], spec.get("period")), [])
+        if spec["value"] not in values:
+            values.append(spec["value"])
+    
+    aggregates = {}
+    for (col, period), values in groups.items():
+        keys = df[col]
+        if period is not None:
+            if not pd.api.types.is_datetime64_any_dtype(keys):
+                keys = pd.to_datetime(keys)
+            keys = keys.dt.to_period(period)
+        grouped = df.groupby(keys, observed=True)
+        agg = grouped[values].sum()
+        agg["n"] = grouped.size()
+        if period is not None:
+            agg.index = agg.index.to_timestamp()
+        aggregates[col] = agg
+    
+    messages = []
+    for spec in specs:
+        if df.empty:
+            messages.append("No hay datos.")
+            continue
+        series = aggregates[spec["by"]][spec["value"]]
+        kind = spec["kind"]
+        if kind == "trend":
+            messages.append(_trend_text(series.sort_index()))
+        elif kind == "distribution":
+            messages.append(_distribution_text(series.sort_values(ascending=False)))
+        elif kind == "performance":
+            messages.append(_performance_text(series.sort_values(ascending=False), spec.get("label", "Rentabilidad")))
+        else:
+            # "aggregate": only contributes a measure to the shared aggregates
+            messages.append(None)
+    return messages, aggregates
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _cached_insights(version, state, specs, _df):
+    note_miss()
+    return _compute_insights(_df, specs)
+
+def compute_insights(df, specs, version=None, state=None):
+    """
+    Batched insight engine.
+    specs is a list of dicts {"kind", "by", "value", "period"?, "label"?}
+    with kind in "trend" (by a date column, per period), "distribution",
+    "performance" or "aggregate" (no message, just an extra measure).
+    All specs grouping by the same column share one groupby.
+    Returns (messages, aggregates): one message per spec (None for
+    "aggregate") and, per grouping column, a frame with the summed values
+    and the row count 'n', which the views reuse for their charts.
+    When a data version is given, results are memoized per
+    (version, state, specs); state must capture any filter applied to df.
+    """
+    name = "+".join(dict.fromkeys(spec["by"] for spec in specs))
+    with timed("insights", name, cached=version is not None) as record:
+        record.rows = len(df)
+        if version is None:
+            return _compute_insights(df, specs)
+        return _cached_insights(version, state, specs, df)
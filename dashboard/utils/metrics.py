@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+try:
+    import psutil
+except ImportError:  # optional: process memory falls back to /proc
+    psutil = None
+
+# Instrumentation of the loader tables, processing steps and view sections
+METRICS_ENABLED = os.environ.get("ANDINA_METRICS", "1") != "0"
+# If set, the Prometheus text is written here after every run (node
+# exporter textfile collector)
+METRICS_EXPORT_PATH = os.environ.get("ANDINA_METRICS_PATH")
+
+_local = threading.local()
+
+
+def _rss_mb():
+    """Resident memory of the process in MB (None if unknown)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Record:
+    """One timed section: set rows (and cache) while it runs."""
+    def __init__(self, kind, name, cache=None):
+        self.kind = kind
+        self.name = name
+        self.cache = cache  # "hit" / "miss" / None (not cached)
+        self.rows = None
+        self.seconds = 0.0
+        self.memory_mb = None
+
+
+class MetricsRegistry:
+    """
+    Thread-safe per-(kind, name) statistics of the timed sections:
+    calls, cache hits/misses and total/last wall time, plus rows and
+    memory delta of the last call.
+    """
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            stats = self._stats.setdefault((record.kind, record.name), {
+                "kind": record.kind, "name": record.name, "calls": 0,
+                "hits": 0, "misses": 0, "seconds_total": 0.0,
+            })
+            stats["calls"] += 1
+            if record.cache == "hit":
+                stats["hits"] += 1
+            elif record.cache == "miss":
+                stats["misses"] += 1
+            stats["seconds_total"] += record.seconds
+            stats["seconds_last"] = record.seconds
+            stats["rows_last"] = record.rows
+            stats["memory_mb_last"] = record.memory_mb
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(stats) for stats in self._stats.values()]
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics():
+    """Process-wide registry shared by all sessions."""
+    return MetricsRegistry()
+
+
+@contextmanager
+def timed(kind, name, cached=False):
+    """
+    Records the wall time, memory delta (process RSS, so concurrent
+    sections overlap) and rows of the enclosed block under (kind, name).
+    With cached=True the block is counted as a cache hit unless
+    note_miss() is called inside it (e.g. from the body of the cached
+    function). Yields the Record so the caller can set rows.
+    """
+    record = Record(kind, name, cache="hit" if cached else None)
+    if not METRICS_ENABLED:
+        yield record
+        return
+
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(record)
+    memory = _rss_mb()
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - started
+        after = _rss_mb()
+        record.memory_mb = after - memory if memory is not None and after is not None else None
+        stack.pop()
+        get_metrics().add(record)
+
+
+def note_miss():
+    """Marks the innermost timed section of this thread as a cache miss."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].cache = "miss"
+
+
+def metrics_json(extra=None):
+    """Statistics as a JSON document ({"sections": [...], **extra})."""
+    return json.dumps({"sections": get_metrics().snapshot(), **(extra or {})}, indent=2, default=str)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def metrics_prometheus(gauges=None):
+    """
+    Statistics in the Prometheus text exposition format.
+    gauges adds plain {metric name: value} samples.
+    """
+    series = {
+        "andina_section_calls_total": ("counter", "Timed section executions", "calls"),
+        "andina_section_cache_hits_total": ("counter", "Section cache hits", "hits"),
+        "andina_section_cache_misses_total": ("counter", "Section cache misses", "misses"),
+        "andina_section_seconds_total": ("counter", "Wall time spent in the section", "seconds_total"),
+        "andina_section_last_seconds": ("gauge", "Wall time of the last execution", "seconds_last"),
+        "andina_section_last_rows": ("gauge", "Rows processed by the last execution", "rows_last"),
+        "andina_section_last_memory_mb": ("gauge", "Process memory delta of the last execution", "memory_mb_last"),
+    }
+    sections = get_metrics().snapshot()
+    lines = []
+    for metric, (kind, help_text, field) in series.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for stats in sections:
+            if stats.get(field) is not None:
+                lines.append(f'{metric}{{kind="{_label(stats["kind"])}",name="{_label(stats["name"])}"}} {stats[field]}')
+    for metric, value in (gauges or {}).items():
+        if value is not None:
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(gauges=None):
+    """Writes metrics_prometheus() to METRICS_EXPORT_PATH (if set), atomically."""
+    if not METRICS_ENABLED or not METRICS_EXPORT_PATH:
+        return
+    tmp_path = f"{METRICS_EXPORT_PATH}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(metrics_prometheus(gauges))
+        os.replace(tmp_path, METRICS_EXPORT_PATH)
+    except OSError:
+        pass
+
+
+def runtime_gauges(data=None):
+    """Figure cache counters and processed data memory as gauges."""
+    from utils.figure_cache import get_figure_cache
+
+    cache = get_figure_cache()
+    gauges = {
+        "andina_figure_cache_hits": cache.hits,
+        "andina_figure_cache_misses": cache.misses,
+        "andina_figure_cache_entries": len(cache),
+    }
+    report = getattr(data, "memory_report", None)
+    if report is not None and not report.empty:
+        gauges["andina_tables_memory_mb"] = round(float(report["mb_after"].sum()), 3)
+    return gauges
@@ -2,41 +2,87 @@ import streamlit as st
 import plotly.express as px
 import pandas as pd
 from utils.insights import analyze_distribution, display_insight_box
+from data.queries import run_aggregation
+from data.aging import get_aging
+from data.materialized import get_results
+from data.periods import DEFAULT_PERIOD
+from utils.figure_cache import cached
 
-def show(data):
+# Datasets this page needs (see data.processor.load_datasets)
+REQUIRES = ["cartera", "cartera_aging"]
+
+def compute(data, as_of=None):
+    """
+    KPIs, insights and aggregates of the receivables, with dias_mora as
+    loaded or recomputed at as_of (no rendering).
+    """
+    # Assuming 'dias_mora' > 0 means overdue
+    if as_of is None:
+        # Aggregations run in the database when the data came from Supabase
+        kpis = run_aggregation("credit_risk.kpis", data).iloc[0]
+        region_risk = run_aggregation("credit_risk.region_risk", data)
+        aging_summary = run_aggregation("credit_risk.aging_summary", data)
+        top_delinquent = run_aggregation("credit_risk.top_delinquent", data, top=20)
+    else:
+        # dias_mora recomputed from fecha_vencimiento at the cutoff date
+        aging = get_aging(data, as_of=as_of)
+        kpis = aging.kpis.iloc[0]
+        region_risk = aging.by_region
+        aging_summary = aging.summary
+        top_delinquent = aging.top_delinquent(20)
+    
+    total_receivables = kpis['total_receivables']
+    overdue_receivables = kpis['overdue_receivables']
+    return {
+        "total_receivables": total_receivables,
+        "overdue_receivables": overdue_receivables,
+        "overdue_pct": (overdue_receivables / total_receivables) * 100 if total_receivables > 0 else 0,
+        "insight_region": analyze_distribution(region_risk, 'region', 'saldo_cop') if not region_risk.empty else None,
+        "region_risk": region_risk,
+        "aging_summary": aging_summary,
+        "top_delinquent": top_delinquent,
+    }
+
+def precompute_filters(data):
+    """Only the loaded dias_mora: arbitrary cutoffs are computed on demand."""
+    return [{"as_of": None}]
+
+def show(data, periodo=None):
     st.title("Análisis de Riesgo Crediticio")
     
     if "cartera" not in data:
         st.error("Datos no disponibles.")
         return
         
-    df = data["cartera"].copy()
+    # The portfolio is a balance at a cutoff date, not a flow over time:
+    # the global period does not apply (the cutoff below does)
+    if periodo not in (None, DEFAULT_PERIOD):
+        st.caption("El periodo global no aplica: la cartera es un saldo a la fecha de corte.")
     
-    # Ensure dates
-    df['fecha_factura'] = pd.to_datetime(df['fecha_factura'])
-    df['fecha_vencimiento'] = pd.to_datetime(df['fecha_vencimiento'])
+    # --- Filters ---
+    with st.expander("Fecha de Corte", expanded=False):
+        recompute = st.checkbox("Recalcular días de mora a una fecha de corte")
+        as_of = st.date_input("Fecha de corte", value=pd.Timestamp.today().date()) if recompute else None
     
-    # --- KPIs ---
-    total_receivables = df['saldo_cop'].sum()
-    # Assuming 'dias_mora' > 0 means overdue
-    overdue_receivables = df[df['dias_mora'] > 0]['saldo_cop'].sum()
-    overdue_pct = (overdue_receivables / total_receivables) * 100 if total_receivables > 0 else 0
+    results = get_results("credit_risk", compute, data, as_of=pd.Timestamp(as_of) if as_of is not None else None)
+    region_risk = results['region_risk']
+    aging_summary = results['aging_summary']
+    overdue_pct = results['overdue_pct']
     
+    # --- KPIs ---
     kpi1, kpi2, kpi3 = st.columns(3)
-    kpi1.metric("Total Cartera", f"${total_receivables:,.0f}")
-    kpi2.metric("Cartera Vencida", f"${overdue_receivables:,.0f}")
+    kpi1.metric("Total Cartera", f"${results['total_receivables']:,.0f}")
+    kpi2.metric("Cartera Vencida", f"${results['overdue_receivables']:,.0f}")
     kpi3.metric("Riesgo de Portafolio (%)", f"{overdue_pct:.1f}%")
     
     st.markdown("---")
     
     # --- Insights ---
     st.subheader("💡 Insights Automáticos")
-    overdue_df = df[df['dias_mora'] > 0]
-    if not overdue_df.empty:
-        insight_region = analyze_distribution(overdue_df, 'region', 'saldo_cop')
+    if results['insight_region'] is not None:
         content = f"""
         *   ⚠️ **Cartera Vencida:** {overdue_pct:.1f}% del total.
-        *   {insight_region}
+        *   {results['insight_region']}
         """
         display_insight_box("Análisis de Riesgo", content)
     else:
@@ -46,47 +92,27 @@ def show(data):
     
     # 1. Aging Analysis
     st.subheader("Edades de Cartera")
+    # Buckets: Al Día, 1-30, 31-60, 61-90, 90+ días (in that order)
     
-    def categorize_aging(days):
-        if days <= 0: return "Al Día"
-        elif days <= 30: return "1-30 Días"
-        elif days <= 60: return "31-60 Días"
-        elif days <= 90: return "61-90 Días"
-        else: return "90+ Días"
-        
-    df['aging_bucket'] = df['dias_mora'].apply(categorize_aging)
-    
-    # Order buckets
-    bucket_order = ["Al Día", "1-30 Días", "31-60 Días", "61-90 Días", "90+ Días"]
-    
-    aging_summary = df.groupby('aging_bucket')['saldo_cop'].sum().reindex(bucket_order).reset_index()
-    
-    fig_aging = px.bar(
+    fig_aging = cached("credit_risk", "aging", data, lambda: px.bar(
         aging_summary, 
         x='aging_bucket', 
         y='saldo_cop', 
         title="Cartera por Rango de Mora",
         text_auto='.2s',
         labels={'saldo_cop': 'Saldo (COP)', 'aging_bucket': 'Días de Mora'}
-    )
+    ), filters={"as_of": as_of})
     st.plotly_chart(fig_aging, use_container_width=True)
     
     # 2. Risk by Region
     st.subheader("Saldo Vencido por Región")
-    region_risk = df[df['dias_mora'] > 0].groupby("region")['saldo_cop'].sum().reset_index().sort_values("saldo_cop", ascending=False)
-    
-    fig_region = px.pie(region_risk, values='saldo_cop', names='region', labels={'saldo_cop': 'Saldo Vencido', 'region': 'Región'})
+    fig_region = cached("credit_risk", "region", data, lambda: px.pie(region_risk, values='saldo_cop', names='region', labels={'saldo_cop': 'Saldo Vencido', 'region': 'Región'}), filters={"as_of": as_of})
     st.plotly_chart(fig_region, use_container_width=True)
     
     # 3. Top Delinquent Accounts
     st.subheader("Facturas con Mayor Mora")
-    top_delinquent = df[df['dias_mora'] > 0].groupby(['cliente_id', 'documento_id']).agg({
-        'saldo_cop': 'sum',
-        'dias_mora': 'max'
-    }).reset_index().sort_values("saldo_cop", ascending=False).head(20)
-    
     st.dataframe(
-        top_delinquent,
+        results['top_delinquent'],
         column_config={
             "cliente_id": "ID Cliente",
             "documento_id": "Factura",
@@ -1,36 +1,85 @@
 import streamlit as st
 import plotly.express as px
-from utils.insights import analyze_distribution, analyze_performance, display_insight_box
+from utils.insights import analyze_distribution, display_insight_box
+from data.queries import run_aggregation, last_sales_month, sales_members
+from data.materialized import get_results
+from data.periods import resolve_period, preset_periods, period_label
+from utils.figure_cache import cached
 
-def show(data):
+# Datasets this page needs (see data.processor.load_datasets)
+REQUIRES = ["ventas_star", "ventas_cube"]
+
+def compute(data, segmento=None, desde=None, hasta=None):
+    """
+    Insights and aggregates for one segment and period (None = all), no
+    rendering.
+    """
+    period = {"desde": desde, "hasta": hasta}
+    segment_sales = run_aggregation("customers.segment_sales", data, segmento=segmento, **period)
+    city_sales = run_aggregation("customers.city_sales", data, segmento=segmento, **period)
+    
+    top_customers = run_aggregation("customers.top_customers", data, segmento=segmento, top=20, **period)
+    
+    # Calculate profit margin per customer
+    top_customers = top_customers.assign(profit_margin=top_customers['margen_total_cop'] / top_customers['subtotal_cop'] * 100)
+    
+    return {
+        "insight_seg": analyze_distribution(segment_sales, 'segmento', 'subtotal_cop'),
+        "insight_city": analyze_distribution(city_sales, 'ciudad', 'subtotal_cop'),
+        "segment_sales": segment_sales,
+        "city_sales": city_sales,
+        "top_customers": top_customers.sort_values("subtotal_cop", ascending=False).head(20),
+    }
+
+def precompute_filters(data):
+    """All segments and each one, for the whole history and every preset period (tools.precompute)."""
+    periods = [(None, None)] + preset_periods(last_sales_month(data))
+    return [
+        {"segmento": segmento, "desde": desde, "hasta": hasta}
+        for desde, hasta in periods
+        for segmento in [None] + sales_members(data, "segmento")
+    ]
+
+def show(data, periodo=None):
     st.title("Gestión de Clientes")
     
-    if "ventas_enriched" not in data:
+    if "ventas_star" not in data:
         st.error("Datos no disponibles.")
         return
         
-    df = data["ventas_enriched"]
+    # A filter change reruns only this fragment, not the whole script
+    # (data loading, sidebar)
+    desde, hasta = resolve_period(periodo, last_sales_month(data))
+    if period_label(desde, hasta):
+        st.caption(f"Periodo: {period_label(desde, hasta)}")
+    _segment_section(data, desde, hasta)
+
+@st.fragment
+def _segment_section(data, desde=None, hasta=None):
+    """
+    Filter, insights, charts and ranking that depend on the segment
+    (within the global period).
+    """
     
     # --- Filters ---
     with st.expander("Filtros", expanded=True):
         col1, col2 = st.columns(2)
         with col1:
-            segments = ["Todos"] + sorted(list(df["segmento"].dropna().unique()))
+            segments = ["Todos"] + sales_members(data, "segmento")
             selected_seg = st.selectbox("Seleccionar Segmento", segments)
             
-        if selected_seg != "Todos":
-            df = df[df["segmento"] == selected_seg]
+        segmento = selected_seg if selected_seg != "Todos" else None
             
+    filters = {"segmento": segmento, "desde": desde, "hasta": hasta}
+    results = get_results("customers", compute, data, **filters)
+    
     st.markdown("---")
     
     # --- Insights ---
     st.subheader("💡 Insights Automáticos")
-    insight_seg = analyze_distribution(df, 'segmento', 'subtotal_cop')
-    insight_city = analyze_distribution(df, 'ciudad', 'subtotal_cop')
-    
     content = f"""
-    *   {insight_seg}
-    *   {insight_city}
+    *   {results['insight_seg']}
+    *   {results['insight_city']}
     """
     display_insight_box("Perfil del Cliente", content)
     
@@ -38,39 +87,21 @@ def show(data):
     
     # 1. Sales by Segment (Pie Chart)
     st.subheader("Participación de Ingresos por Segmento")
-    segment_sales = df.groupby("segmento")['subtotal_cop'].sum().reset_index()
-    fig_segment = px.pie(
-        segment_sales, 
+    fig_segment = cached("customers", "segment", data, lambda: px.pie(
+        results['segment_sales'], 
         values='subtotal_cop', 
         names='segmento', 
         hole=0.4,
         color_discrete_sequence=px.colors.qualitative.Set3,
         labels={'subtotal_cop': 'Ingresos', 'segmento': 'Segmento'}
-    )
+    ), filters=filters)
     st.plotly_chart(fig_segment, use_container_width=True)
     
     # 2. Top Customers Leaderboard
     st.subheader("Ranking de Mejores Clientes")
     
-    # Check for client name column
-    client_name_col = 'nombre_cliente'
-    if client_name_col not in df.columns:
-        # Fallback if name is missing
-        client_name_col = 'cliente_id'
-        
-    top_customers = df.groupby(['cliente_id', client_name_col]).agg({
-        'subtotal_cop': 'sum',
-        'margen_total_cop': 'sum',
-        'venta_id': 'count'
-    }).reset_index().rename(columns={'venta_id': 'transacciones'})
-    
-    # Calculate profit margin per customer
-    top_customers['profit_margin'] = (top_customers['margen_total_cop'] / top_customers['subtotal_cop']) * 100
-    
-    top_customers = top_customers.sort_values("subtotal_cop", ascending=False).head(20)
-    
     st.dataframe(
-        top_customers,
+        results['top_customers'],
         column_config={
             "cliente_id": "ID Cliente",
             "nombre_cliente": "Cliente",
@@ -85,14 +116,12 @@ def show(data):
     
     # 3. Geographic Distribution
     st.subheader("Top Ciudades por Ingresos")
-    city_sales = df.groupby("ciudad")['subtotal_cop'].sum().reset_index().sort_values("subtotal_cop", ascending=False).head(15)
-    
-    fig_city = px.bar(
-        city_sales, 
+    fig_city = cached("customers", "city", data, lambda: px.bar(
+        results['city_sales'].head(15), 
         x='ciudad', 
         y='subtotal_cop',
         text_auto='.2s',
         labels={'subtotal_cop': 'Ingresos (COP)', 'ciudad': 'Ciudad'},
         template="plotly_white"
-    )
+    ), filters=filters)
     st.plotly_chart(fig_city, use_container_width=True)
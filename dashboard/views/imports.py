@@ -1,44 +1,83 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
-from utils.insights import analyze_trend, analyze_performance, display_insight_box
+from utils.insights import compute_insights, display_insight_box
+from data.materialized import get_results
+from data.filters import filter_rows
+from data.periods import resolve_period, preset_periods, period_label
+from utils.figure_cache import cached
 
-def show(data):
+# Datasets this page needs (see data.processor.load_datasets)
+REQUIRES = ["importaciones", "importaciones_index"]
+
+def _latest_order(data):
+    return data["importaciones"]["fecha_orden"].max()
+
+def compute(data, desde=None, hasta=None):
+    """
+    KPIs, insights and aggregates of the page for the orders placed in one
+    period (None = unbounded), no rendering.
+    """
+    # Dates are already parsed in process_data; the period is a run of the
+    # date-ordered index
+    df = filter_rows(data, "importaciones", desde=desde, hasta=hasta)
+    
+    # Calculate Lead Time
+    df = df.assign(lead_time_days=(df['fecha_llegada'] - df['fecha_orden']).dt.days)
+    
+    # Insights and charts share the same monthly / per-supplier aggregates
+    (insight_trend, insight_supp), aggregates = compute_insights(df, [
+        {"kind": "trend", "by": "fecha_orden", "value": "costo_mercancia_usd", "period": "M"},
+        {"kind": "performance", "by": "proveedor", "value": "costo_mercancia_usd", "label": "Proveedor"},
+    ], version=getattr(data, "version", None), state=f"imports:{desde}:{hasta}")
+    
+    return {
+        "total_imports_usd": df['costo_mercancia_usd'].sum(),
+        "avg_lead_time": df['lead_time_days'].mean(),
+        "total_shipments": len(df),
+        "insight_trend": insight_trend,
+        "insight_supp": insight_supp,
+        "monthly_costs": aggregates['fecha_orden']['costo_mercancia_usd'].reset_index(),
+        "top_suppliers_val": aggregates['proveedor']['costo_mercancia_usd'].reset_index().sort_values("costo_mercancia_usd", ascending=False).head(10),
+        "top_suppliers_vol": aggregates['proveedor']['n'].reset_index().rename(columns={'n': 'count'}).sort_values("count", ascending=False).head(10),
+        # Lead times per shipment, for the histogram
+        "lead_times": df[['lead_time_days']],
+        "avg_lead_time_supp": df.groupby("proveedor", observed=True)['lead_time_days'].mean().reset_index().sort_values("lead_time_days", ascending=False).head(10),
+    }
+
+def precompute_filters(data):
+    """Whole history and every preset period, for tools.precompute."""
+    periods = [(None, None)] + preset_periods(_latest_order(data))
+    return [{"desde": desde, "hasta": hasta} for desde, hasta in periods]
+
+def show(data, periodo=None):
     st.title("Importaciones y Costos")
     
     if "importaciones" not in data:
         st.error("Datos no disponibles.")
         return
         
-    df = data["importaciones"].copy()
-    
-    # Ensure dates
-    df['fecha_orden'] = pd.to_datetime(df['fecha_orden'])
-    df['fecha_llegada'] = pd.to_datetime(df['fecha_llegada'])
-    
-    # Calculate Lead Time
-    df['lead_time_days'] = (df['fecha_llegada'] - df['fecha_orden']).dt.days
+    desde, hasta = resolve_period(periodo, _latest_order(data))
+    period = {"desde": desde, "hasta": hasta}
+    if period_label(desde, hasta):
+        st.caption(f"Periodo (fecha de orden): {period_label(desde, hasta)}")
+    results = get_results("imports", compute, data, **period)
+    if results['total_shipments'] == 0:
+        st.warning("No hay importaciones en el periodo seleccionado.")
+        return
     
     # --- KPIs ---
-    total_imports_usd = df['costo_mercancia_usd'].sum()
-    avg_lead_time = df['lead_time_days'].mean()
-    total_shipments = len(df)
-    
     kpi1, kpi2, kpi3 = st.columns(3)
-    kpi1.metric("Total Importaciones (USD)", f"${total_imports_usd:,.0f}")
-    kpi2.metric("Tiempo Promedio Entrega", f"{avg_lead_time:.1f} días")
-    kpi3.metric("Total Envíos", f"{total_shipments}")
+    kpi1.metric("Total Importaciones (USD)", f"${results['total_imports_usd']:,.0f}")
+    kpi2.metric("Tiempo Promedio Entrega", f"{results['avg_lead_time']:.1f} días")
+    kpi3.metric("Total Envíos", f"{results['total_shipments']}")
     
     st.markdown("---")
     
     # --- Insights ---
     st.subheader("💡 Insights Automáticos")
-    insight_trend = analyze_trend(df, 'fecha_orden', 'costo_mercancia_usd')
-    insight_supp = analyze_performance(df, 'proveedor', 'costo_mercancia_usd', label="Proveedor")
-    
     content = f"""
-    *   {insight_trend}
-    *   {insight_supp}
+    *   {results['insight_trend']}
+    *   {results['insight_supp']}
     """
     display_insight_box("Análisis de Importaciones", content)
     
@@ -46,10 +85,7 @@ def show(data):
     
     # 1. Cost Trend
     st.subheader("Tendencia de Costos de Importación (USD)")
-    monthly_costs = df.groupby(df['fecha_orden'].dt.to_period("M"))['costo_mercancia_usd'].sum().reset_index()
-    monthly_costs['fecha_orden'] = monthly_costs['fecha_orden'].dt.to_timestamp()
-    
-    fig_trend = px.line(monthly_costs, x='fecha_orden', y='costo_mercancia_usd', markers=True, labels={'fecha_orden': 'Fecha Orden', 'costo_mercancia_usd': 'Costo (USD)'})
+    fig_trend = cached("imports", "trend", data, lambda: px.line(results['monthly_costs'], x='fecha_orden', y='costo_mercancia_usd', markers=True, labels={'fecha_orden': 'Fecha Orden', 'costo_mercancia_usd': 'Costo (USD)'}), filters=period)
     st.plotly_chart(fig_trend, use_container_width=True)
     
     # 2. Top Suppliers
@@ -58,44 +94,41 @@ def show(data):
     
     with col1:
         # By Value
-        top_suppliers_val = df.groupby("proveedor")['costo_mercancia_usd'].sum().reset_index().sort_values("costo_mercancia_usd", ascending=False).head(10)
-        fig_supp_val = px.bar(
-            top_suppliers_val, 
+        fig_supp_val = cached("imports", "supp_val", data, lambda: px.bar(
+            results['top_suppliers_val'], 
             x='costo_mercancia_usd', 
             y='proveedor', 
             orientation='h', 
             title="Por Valor (USD)", 
             text_auto='.2s',
             labels={'costo_mercancia_usd': 'Costo (USD)', 'proveedor': 'Proveedor'}
-        )
+        ), filters=period)
         st.plotly_chart(fig_supp_val, use_container_width=True)
         
     with col2:
         # By Volume (count of imports)
-        top_suppliers_vol = df.groupby("proveedor")['importacion_id'].count().reset_index().rename(columns={'importacion_id': 'count'}).sort_values("count", ascending=False).head(10)
-        fig_supp_vol = px.bar(
-            top_suppliers_vol, 
+        fig_supp_vol = cached("imports", "supp_vol", data, lambda: px.bar(
+            results['top_suppliers_vol'], 
             x='count', 
             y='proveedor', 
             orientation='h', 
             title="Por Volumen (Envíos)", 
             text_auto=True,
             labels={'count': 'Cantidad Envíos', 'proveedor': 'Proveedor'}
-        )
+        ), filters=period)
         st.plotly_chart(fig_supp_vol, use_container_width=True)
         
     # 3. Lead Time Analysis
     st.subheader("Análisis de Tiempos de Entrega")
     st.caption("Días entre Fecha de Orden y Fecha de Llegada")
     
-    fig_hist = px.histogram(df, x='lead_time_days', nbins=20, title="Distribución de Tiempos de Entrega", labels={'lead_time_days': 'Días'})
+    fig_hist = cached("imports", "hist", data, lambda: px.histogram(results['lead_times'], x='lead_time_days', nbins=20, title="Distribución de Tiempos de Entrega", labels={'lead_time_days': 'Días'}), filters=period)
     st.plotly_chart(fig_hist, use_container_width=True)
     
     # Average Lead Time by Supplier
-    avg_lead_time_supp = df.groupby("proveedor")['lead_time_days'].mean().reset_index().sort_values("lead_time_days", ascending=False).head(10)
     st.write("Tiempo Promedio de Entrega por Proveedor (Top 10 Más Lentos)")
     st.dataframe(
-        avg_lead_time_supp, 
+        results['avg_lead_time_supp'], 
         column_config={
             "proveedor": "Proveedor",
             "lead_time_days": st.column_config.NumberColumn("Días Promedio", format="%.1f")
@@ -1,46 +1,109 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-from utils.insights import analyze_distribution, display_insight_box
+from utils.insights import compute_insights, display_insight_box
+from data.materialized import get_results
+from data.periods import resolve_period, preset_periods, period_label, date_bounds
+from utils.figure_cache import cached
 
-def show(data):
+# Datasets this page needs (see data.processor.load_datasets)
+REQUIRES = ["inventario_store"]
+
+def compute(data, fecha_corte=None, desde=None, hasta=None):
+    """
+    KPIs, insights and aggregates of the inventory at a cutoff date
+    (the latest one by default) and its history over a period (None =
+    unbounded), without rendering.
+    """
+    # Inventory partitioned by cutoff: only the selected snapshot is read
+    store = data["inventario_store"]
+    if fecha_corte is None:
+        # Latest snapshot is materialized
+        latest_date, current_inventory = store.latest_date, store.latest
+    else:
+        latest_date, current_inventory = store.as_of(fecha_corte)
+    
+    # Insights and charts share the same per-center / per-category aggregates
+    (insight_center, insight_cat, _), aggregates = compute_insights(current_inventory, [
+        {"kind": "distribution", "by": "centro_logistico", "value": "valor_inventario_cop"},
+        {"kind": "distribution", "by": "categoria", "value": "valor_inventario_cop"},
+        {"kind": "aggregate", "by": "categoria", "value": "stock_unidades"},
+    ], version=getattr(data, "version", None), state=("inventory", latest_date))
+    
+    center_value = aggregates['centro_logistico']['valor_inventario_cop'].reset_index().sort_values("valor_inventario_cop", ascending=False)
+    # Totals are sorted by cutoff: the period is a contiguous slice
+    lo, hi = date_bounds(store.totals['fecha_corte'].to_numpy(), desde, hasta)
+    history = store.totals.iloc[lo:hi][['fecha_corte', 'valor_inventario_cop']]
+    
+    return {
+        "fecha_corte": latest_date,
+        "total_value": current_inventory['valor_inventario_cop'].sum(),
+        "total_units": current_inventory['stock_unidades'].sum(),
+        "total_skus": current_inventory['producto_id'].nunique(),
+        "insight_center": insight_center,
+        "insight_cat": insight_cat,
+        # Scale to Billions (Miles de Millones) for display
+        "center_value": center_value.assign(valor_display=center_value['valor_inventario_cop'] / 1e9),
+        "cat_value": aggregates['categoria']['valor_inventario_cop'].reset_index(),
+        "cat_units": aggregates['categoria']['stock_unidades'].reset_index(),
+        "history": history.assign(valor_display=history['valor_inventario_cop'] / 1e9),
+    }
+
+def precompute_filters(data):
+    """
+    Every cutoff date (None = latest) and the latest cutoff of every preset
+    period, for tools.precompute.
+    """
+    store = data["inventario_store"]
+    periods = preset_periods(store.latest_date)
+    return (
+        [{"fecha_corte": None}]
+        + [{"fecha_corte": pd.Timestamp(d)} for d in store.dates[:-1]]
+        + [{"fecha_corte": None, "desde": desde, "hasta": hasta} for desde, hasta in periods]
+    )
+
+def show(data, periodo=None):
     st.title("Inventario y Operaciones")
     
-    if "inventario" not in data:
+    if "inventario_store" not in data or data["inventario_store"].latest_date is None:
         st.error("Datos no disponibles.")
         return
         
-    df = data["inventario"].copy()
+    store = data["inventario_store"]
+    desde, hasta = resolve_period(periodo, store.latest_date)
+    if period_label(desde, hasta):
+        st.caption(f"Periodo: {period_label(desde, hasta)}")
+    
+    # Cutoffs within the period (dates are sorted)
+    lo, hi = date_bounds(store.dates, desde, hasta)
+    if lo == hi:
+        st.warning("No hay cortes de inventario en el periodo seleccionado.")
+        return
     
-    # Ensure date
-    df['fecha_corte'] = pd.to_datetime(df['fecha_corte'])
+    # --- Filters ---
+    with st.expander("Filtros", expanded=False):
+        cutoffs = [pd.Timestamp(d).date() for d in store.dates[lo:hi][::-1]]
+        selected_date = st.selectbox("Fecha de corte", cutoffs)
     
-    # Filter by latest date (Snapshot)
-    latest_date = df['fecha_corte'].max()
+    fecha_corte = None if selected_date == store.latest_date.date() else pd.Timestamp(selected_date)
+    period = {"desde": desde, "hasta": hasta}
+    results = get_results("inventory", compute, data, fecha_corte=fecha_corte, **period)
+    latest_date = results['fecha_corte']
     st.info(f"Mostrando inventario al corte de: {latest_date.date()}")
     
-    current_inventory = df[df['fecha_corte'] == latest_date]
-    
     # --- KPIs ---
-    total_value = current_inventory['valor_inventario_cop'].sum()
-    total_units = current_inventory['stock_unidades'].sum()
-    total_skus = current_inventory['producto_id'].nunique()
-    
     kpi1, kpi2, kpi3 = st.columns(3)
-    kpi1.metric("Valor Total Inventario", f"${total_value:,.0f}")
-    kpi2.metric("Unidades Totales", f"{total_units:,.0f}")
-    kpi3.metric("Total SKUs", f"{total_skus}")
+    kpi1.metric("Valor Total Inventario", f"${results['total_value']:,.0f}")
+    kpi2.metric("Unidades Totales", f"{results['total_units']:,.0f}")
+    kpi3.metric("Total SKUs", f"{results['total_skus']}")
     
     st.markdown("---")
     
     # --- Insights ---
     st.subheader("💡 Insights Automáticos")
-    insight_center = analyze_distribution(current_inventory, 'centro_logistico', 'valor_inventario_cop')
-    insight_cat = analyze_distribution(current_inventory, 'categoria', 'valor_inventario_cop')
-    
     content = f"""
-    *   {insight_center}
-    *   {insight_cat}
+    *   {results['insight_center']}
+    *   {results['insight_cat']}
     """
     display_insight_box("Estado del Inventario", content)
     
@@ -48,20 +111,20 @@ def show(data):
     
     # 1. Value by Logistic Center
     st.subheader("Valor de Inventario por Centro Logístico")
-    center_value = current_inventory.groupby("centro_logistico")['valor_inventario_cop'].sum().reset_index().sort_values("valor_inventario_cop", ascending=False)
-    
-    # Scale to Billions (Miles de Millones) for display
-    center_value['valor_display'] = center_value['valor_inventario_cop'] / 1e9
-    
-    fig_center = px.bar(
-        center_value, 
-        x='centro_logistico', 
-        y='valor_display', 
-        title="Valor por Centro", 
-        text_auto='.1f',
-        labels={'valor_display': 'Valor (Miles de Millones COP)', 'centro_logistico': 'Centro Logístico'}
-    )
-    fig_center.update_yaxes(tickformat=".1f") # Show 1 decimal place e.g. 3.0
+    
+    def build_center_chart():
+        fig = px.bar(
+            results['center_value'], 
+            x='centro_logistico', 
+            y='valor_display', 
+            title="Valor por Centro", 
+            text_auto='.1f',
+            labels={'valor_display': 'Valor (Miles de Millones COP)', 'centro_logistico': 'Centro Logístico'}
+        )
+        fig.update_yaxes(tickformat=".1f") # Show 1 decimal place e.g. 3.0
+        return fig
+    
+    fig_center = cached("inventory", "center", data, build_center_chart, filters={"fecha_corte": latest_date})
     st.plotly_chart(fig_center, use_container_width=True)
     
     # 2. Category Breakdown
@@ -70,34 +133,34 @@ def show(data):
     
     with col1:
         # By Value
-        cat_value = current_inventory.groupby("categoria")['valor_inventario_cop'].sum().reset_index()
         # Pie chart handles large numbers well usually, but let's be consistent if needed. 
         # Actually Pie charts show percentages mostly, and hover values. 
         # Let's keep raw values for Pie but format hover? 
         # Plotly Pie automatically formats. Let's leave Pie as is unless requested, 
         # but the user specifically showed the Bar chart in the screenshot (implied by "grafica en billones").
         # The screenshot shows the Bar chart with "3B".
-        fig_cat_val = px.pie(cat_value, values='valor_inventario_cop', names='categoria', title="Por Valor", labels={'valor_inventario_cop': 'Valor', 'categoria': 'Categoría'})
+        fig_cat_val = cached("inventory", "cat_val", data, lambda: px.pie(results['cat_value'], values='valor_inventario_cop', names='categoria', title="Por Valor", labels={'valor_inventario_cop': 'Valor', 'categoria': 'Categoría'}), filters={"fecha_corte": latest_date})
         st.plotly_chart(fig_cat_val, use_container_width=True)
         
     with col2:
         # By Units
-        cat_units = current_inventory.groupby("categoria")['stock_unidades'].sum().reset_index()
-        fig_cat_units = px.pie(cat_units, values='stock_unidades', names='categoria', title="Por Unidades", labels={'stock_unidades': 'Unidades', 'categoria': 'Categoría'})
+        fig_cat_units = cached("inventory", "cat_units", data, lambda: px.pie(results['cat_units'], values='stock_unidades', names='categoria', title="Por Unidades", labels={'stock_unidades': 'Unidades', 'categoria': 'Categoría'}), filters={"fecha_corte": latest_date})
         st.plotly_chart(fig_cat_units, use_container_width=True)
         
     # 3. Historical Trend (Total Value)
     st.subheader("Tendencia de Valor de Inventario")
-    history = df.groupby("fecha_corte")['valor_inventario_cop'].sum().reset_index()
-    history['valor_display'] = history['valor_inventario_cop'] / 1e9
-    
-    fig_trend = px.line(
-        history, 
-        x='fecha_corte', 
-        y='valor_display', 
-        markers=True, 
-        title="Valor Total en el Tiempo", 
-        labels={'fecha_corte': 'Fecha Corte', 'valor_display': 'Valor (Miles de Millones COP)'}
-    )
-    fig_trend.update_yaxes(tickformat=".1f")
+    
+    def build_trend_chart():
+        fig = px.line(
+            results['history'], 
+            x='fecha_corte', 
+            y='valor_display', 
+            markers=True, 
+            title="Valor Total en el Tiempo", 
+            labels={'fecha_corte': 'Fecha Corte', 'valor_display': 'Valor (Miles de Millones COP)'}
+        )
+        fig.update_yaxes(tickformat=".1f")
+        return fig
+    
+    fig_trend = cached("inventory", "trend", data, build_trend_chart, filters=period)
     st.plotly_chart(fig_trend, use_container_width=True)
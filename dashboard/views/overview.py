@@ -1,45 +1,76 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 from utils.insights import analyze_trend, analyze_distribution, display_insight_box
+from data.queries import run_aggregation, last_sales_month
+from data.materialized import get_results
+from data.periods import resolve_period, preset_periods, period_label
+from utils.figure_cache import cached
 
-def show(data):
+# Datasets this page needs (see data.processor.load_datasets)
+REQUIRES = ["ventas_star", "ventas_cube", "clientes"]
+
+def compute(data, desde=None, hasta=None):
+    """
+    KPIs, insights and aggregates of the page for one period (None =
+    unbounded), no rendering.
+    """
+    period = {"desde": desde, "hasta": hasta}
+    # Aggregations run in the database when the data came from Supabase
+    kpis = run_aggregation("overview.kpis", data, **period).iloc[0]
+    total_sales = kpis["total_sales"]
+    total_profit = kpis["total_profit"]
+    
+    # Active Customers (from Master if available, else from Sales)
+    active_customers = run_aggregation("overview.active_customers", data)["clientes_activos"].iloc[0]
+    
+    monthly_sales = run_aggregation("overview.monthly_sales", data, **period)
+    region_sales = run_aggregation("overview.region_sales", data, **period)
+    return {
+        "total_sales": total_sales,
+        "total_profit": total_profit,
+        "margin_pct": (total_profit / total_sales) * 100 if total_sales > 0 else 0,
+        "active_customers": active_customers,
+        "insight_trend": analyze_trend(monthly_sales, 'mes', 'subtotal_cop'),
+        "insight_region": analyze_distribution(region_sales, 'region', 'subtotal_cop'),
+        "monthly_sales": monthly_sales,
+        "region_sales": region_sales,
+        # Description if available, else ID
+        "top_products": run_aggregation("overview.top_products", data, top=5, **period),
+    }
+
+def precompute_filters(data):
+    """Whole history and every preset period, for tools.precompute."""
+    periods = [(None, None)] + preset_periods(last_sales_month(data))
+    return [{"desde": desde, "hasta": hasta} for desde, hasta in periods]
+
+def show(data, periodo=None):
     st.title("Resumen General")
     
-    if "ventas_enriched" not in data:
+    if "ventas_star" not in data:
         st.error("Datos de ventas no disponibles.")
         return
 
-    df = data["ventas_enriched"]
+    desde, hasta = resolve_period(periodo, last_sales_month(data))
+    period = {"desde": desde, "hasta": hasta}
+    if period_label(desde, hasta):
+        st.caption(f"Periodo: {period_label(desde, hasta)}")
+    results = get_results("overview", compute, data, **period)
     
     # --- KPIs ---
-    total_sales = df["subtotal_cop"].sum()
-    total_profit = df["margen_total_cop"].sum()
-    margin_pct = (total_profit / total_sales) * 100 if total_sales > 0 else 0
-    
-    # Active Customers (from Master if available, else from Sales)
-    if "clientes" in data:
-        active_customers = data["clientes"][data["clientes"]["estado"] == "Activo"].shape[0]
-    else:
-        active_customers = df["cliente_id"].nunique()
-
     col1, col2, col3, col4 = st.columns(4)
     
-    col1.metric("Ventas Totales", f"${total_sales:,.0f}")
-    col2.metric("Utilidad Total", f"${total_profit:,.0f}")
-    col3.metric("Margen Bruto", f"{margin_pct:.1f}%")
-    col4.metric("Clientes Activos", f"{active_customers}")
+    col1.metric("Ventas Totales", f"${results['total_sales']:,.0f}")
+    col2.metric("Utilidad Total", f"${results['total_profit']:,.0f}")
+    col3.metric("Margen Bruto", f"{results['margin_pct']:.1f}%")
+    col4.metric("Clientes Activos", f"{results['active_customers']}")
     
     st.markdown("---")
     
     # --- Insights ---
     st.subheader("💡 Insights Automáticos")
-    insight_trend = analyze_trend(df, 'fecha', 'subtotal_cop')
-    insight_region = analyze_distribution(df, 'region', 'subtotal_cop')
-    
     content = f"""
-    *   {insight_trend}
-    *   {insight_region}
+    *   {results['insight_trend']}
+    *   {results['insight_region']}
     """
     display_insight_box("Resumen Clave", content)
     
@@ -48,15 +79,8 @@ def show(data):
     # --- Charts ---
     
     # 1. Monthly Sales Trend
-    # Ensure date is datetime
-    if not pd.api.types.is_datetime64_any_dtype(df['fecha']):
-         df['fecha'] = pd.to_datetime(df['fecha'])
-         
-    monthly_sales = df.groupby(df['fecha'].dt.to_period("M"))['subtotal_cop'].sum().reset_index()
-    monthly_sales['fecha'] = monthly_sales['fecha'].dt.to_timestamp()
-    
     st.subheader("Tendencia Mensual de Ventas")
-    fig_trend = px.line(monthly_sales, x='fecha', y='subtotal_cop', markers=True, labels={'fecha': 'Fecha', 'subtotal_cop': 'Ventas (COP)'})
+    fig_trend = cached("overview", "trend", data, lambda: px.line(results['monthly_sales'], x='mes', y='subtotal_cop', markers=True, labels={'mes': 'Fecha', 'subtotal_cop': 'Ventas (COP)'}), filters=period)
     st.plotly_chart(fig_trend, use_container_width=True)
     
     col_left, col_right = st.columns(2)
@@ -64,28 +88,26 @@ def show(data):
     with col_left:
         # 2. Sales by Region
         st.subheader("Ventas por Región")
-        region_sales = df.groupby("region")['subtotal_cop'].sum().reset_index().sort_values("subtotal_cop", ascending=False)
-        fig_region = px.bar(
-            region_sales, 
+        fig_region = cached("overview", "region", data, lambda: px.bar(
+            results['region_sales'], 
             x='region', 
             y='subtotal_cop', 
             text_auto='.2s',
             labels={'region': 'Región', 'subtotal_cop': 'Ventas (COP)'}
-        )
+        ), filters=period)
         st.plotly_chart(fig_region, use_container_width=True)
         
     with col_right:
         # 3. Top 5 Products
         st.subheader("Top 5 Productos por Ingresos")
-        # Use description if available, else ID
-        prod_col = "descripcion" if "descripcion" in df.columns else "producto_id"
-        top_products = df.groupby(prod_col)['subtotal_cop'].sum().reset_index().sort_values("subtotal_cop", ascending=False).head(5)
-        fig_prod = px.bar(
+        top_products = results['top_products']
+        prod_col = top_products.columns[0]
+        fig_prod = cached("overview", "prod", data, lambda: px.bar(
             top_products, 
             x='subtotal_cop', 
             y=prod_col, 
             orientation='h', 
             text_auto='.2s',
             labels={'subtotal_cop': 'Ventas (COP)', prod_col: 'Producto'}
-        )
+        ), filters=period)
         st.plotly_chart(fig_prod, use_container_width=True)
@@ -1,92 +1,136 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
 from utils.insights import analyze_performance, display_insight_box
+from data.queries import run_aggregation, last_sales_month, sales_members
+from data.filters import filter_rows
+from utils.density import density_frame, density_figure
+from data.materialized import get_results
+from data.periods import resolve_period, preset_periods, period_label
+from utils.figure_cache import cached
 
-def show(data):
+# Datasets this page needs (see data.processor.load_datasets)
+REQUIRES = ["ventas_star", "ventas_cube", "ventas_star_index"]
+
+def compute(data, categoria=None, desde=None, hasta=None):
+    """
+    Insights and aggregates for one category and period (None = all), no
+    rendering. The scatter comes as the points or density cells to draw.
+    """
+    period = {"desde": desde, "hasta": hasta}
+    margin_by_sub = run_aggregation("profitability.margin_by_subcategory", data, categoria=categoria, **period)
+    
+    # Indexed take of the selected category's rows in the period, only the
+    # columns the scatter needs (descripcion is joined for those rows alone)
+    df = filter_rows(data, "ventas_star", columns=['precio_unitario_cop', 'categoria', 'descripcion', 'cliente_id', 'margen_total_cop', 'cantidad'], categoria=categoria, **period)
+    
+    # Calculate unit margin for scatter plot
+    plot_df = df[['precio_unitario_cop', 'categoria', 'descripcion', 'cliente_id']].assign(
+        unit_margin=df['margen_total_cop'] / df['cantidad']
+    )
+    # All transactions are represented: large selections are binned server-side
+    scatter, binned = density_frame(plot_df, x='precio_unitario_cop', y='unit_margin', color='categoria')
+    
+    # Group by product
+    sku_stats = run_aggregation("profitability.sku_stats", data, categoria=categoria, **period)
+    sku_stats = sku_stats.assign(margin_pct=sku_stats['margen_total_cop'] / sku_stats['subtotal_cop'] * 100)
+    
+    return {
+        "insight_perf": analyze_performance(margin_by_sub, 'subcategoria', 'margen_total_cop', label="Rentabilidad"),
+        "margin_by_sub": margin_by_sub,
+        "scatter": scatter,
+        "scatter_binned": binned,
+        "sku_stats": sku_stats.sort_values("margen_total_cop", ascending=False),
+    }
+
+def precompute_filters(data):
+    """All categories and each one, for the whole history and every preset period (tools.precompute)."""
+    periods = [(None, None)] + preset_periods(last_sales_month(data))
+    return [
+        {"categoria": categoria, "desde": desde, "hasta": hasta}
+        for desde, hasta in periods
+        for categoria in [None] + sales_members(data, "categoria")
+    ]
+
+def show(data, periodo=None):
     st.title("Rentabilidad Detallada")
     
-    if "ventas_enriched" not in data:
+    if "ventas_star" not in data:
         st.error("Datos no disponibles.")
         return
         
-    df = data["ventas_enriched"].copy()
+    # A filter change reruns only this fragment, not the whole script
+    # (data loading, sidebar)
+    desde, hasta = resolve_period(periodo, last_sales_month(data))
+    if period_label(desde, hasta):
+        st.caption(f"Periodo: {period_label(desde, hasta)}")
+    _category_section(data, desde, hasta)
+
+@st.fragment
+def _category_section(data, desde=None, hasta=None):
+    """
+    Filter, insights, charts and SKU table that depend on the category
+    (within the global period).
+    """
     
     # --- Filters ---
     with st.expander("Filtros", expanded=True):
         col1, col2 = st.columns(2)
         with col1:
-            categories = ["Todas"] + sorted(list(df["categoria"].dropna().unique()))
+            categories = ["Todas"] + sales_members(data, "categoria")
             selected_cat = st.selectbox("Seleccionar Categoría", categories)
         
-        if selected_cat != "Todas":
-            df = df[df["categoria"] == selected_cat]
+        categoria = selected_cat if selected_cat != "Todas" else None
             
+    filters = {"categoria": categoria, "desde": desde, "hasta": hasta}
+    results = get_results("profitability", compute, data, **filters)
+    
     st.markdown("---")
     
     # --- Insights ---
     st.subheader("💡 Insights Automáticos")
-    insight_perf = analyze_performance(df, 'subcategoria', 'margen_total_cop', label="Rentabilidad")
-    
-    content = f"*   {insight_perf}"
+    content = f"*   {results['insight_perf']}"
     display_insight_box("Análisis de Rentabilidad", content)
     
     st.markdown("---")
             
     # 1. Margin by Subcategory
     st.subheader("Margen Total por Subcategoría")
-    # Handle column name variations if any, though we expect 'subcategoria'
-    subcat_col = "subcategoria" if "subcategoria" in df.columns else "subcategory"
-    
-    margin_by_sub = df.groupby(subcat_col)['margen_total_cop'].sum().reset_index().sort_values("margen_total_cop", ascending=False)
-    
-    fig_margin = px.bar(
-        margin_by_sub, 
-        x=subcat_col, 
+    fig_margin = cached("profitability", "margin", data, lambda: px.bar(
+        results['margin_by_sub'], 
+        x='subcategoria', 
         y='margen_total_cop',
         color='margen_total_cop',
         text_auto='.2s',
-        labels={'margen_total_cop': 'Margen Total (COP)', subcat_col: 'Subcategoría'},
+        labels={'margen_total_cop': 'Margen Total (COP)', 'subcategoria': 'Subcategoría'},
         template="plotly_white"
-    )
+    ), filters=filters)
     st.plotly_chart(fig_margin, use_container_width=True)
     
     # 2. Price vs Margin Scatter
     st.subheader("Análisis Precio vs Margen")
-    st.caption("Cada punto representa una transacción de venta. El color indica la categoría.")
-    
-    # Calculate unit margin for scatter plot
-    df['unit_margin'] = df['margen_total_cop'] / df['cantidad']
-    
-    # Sample if too large to prevent lag
-    plot_df = df.sample(n=min(5000, len(df)), random_state=42)
-    
-    fig_scatter = px.scatter(
-        plot_df, 
+    binned = results['scatter_binned']
+    fig_scatter = cached("profitability", "scatter", data, lambda: density_figure(
+        results['scatter'], 
+        binned,
         x='precio_unitario_cop', 
         y='unit_margin', 
         color='categoria',
         hover_data=['descripcion', 'cliente_id'],
         labels={'precio_unitario_cop': 'Precio Unitario (COP)', 'unit_margin': 'Margen Unitario (COP)', 'categoria': 'Categoría'},
         template="plotly_white"
-    )
+    ), filters=filters)
+    if binned:
+        st.caption("Cada punto agrupa las transacciones con precio y margen similares; el tamaño indica cuántas. El color indica la categoría.")
+    else:
+        st.caption("Cada punto representa una transacción de venta. El color indica la categoría.")
     st.plotly_chart(fig_scatter, use_container_width=True)
     
     # 3. Detailed SKU Table
     st.subheader("Top Productos por Rentabilidad")
     
-    # Group by product
-    sku_stats = df.groupby(['producto_id', 'descripcion', 'categoria']).agg({
-        'subtotal_cop': 'sum',
-        'margen_total_cop': 'sum',
-        'cantidad': 'sum'
-    }).reset_index()
-    
-    sku_stats['margin_pct'] = (sku_stats['margen_total_cop'] / sku_stats['subtotal_cop']) * 100
-    
     # Formatting columns
     st.dataframe(
-        sku_stats.sort_values("margen_total_cop", ascending=False),
+        results['sku_stats'],
         column_config={
             "producto_id": "ID Producto",
             "descripcion": "Descripción",